@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import threading
+import multiprocessing
+import datetime
+
+import cv2
+import numpy as np
+
+import make
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CLIPS_DIR = 'benchmark_clips'
+# name: (width, height, fps, seconds, audio)
+CASES = {
+    '720p30_audio': (1280, 720, 30, 10, True),
+    '1080p30_audio': (1920, 1080, 30, 10, True),
+    'vertical_1080x1920': (1080, 1920, 30, 10, True),
+    'square_720': (720, 720, 25, 10, False),
+    '4x3_480p25': (640, 480, 25, 10, False),
+    '1080p60_noaudio': (1920, 1080, 60, 5, False),
+    '4k24': (3840, 2160, 24, 5, True),
+}
+QUICK_CASES = ('720p30_audio', 'vertical_1080x1920', '4x3_480p25')
+STAGE_SAMPLE_FRAMES = 90
+
+def generate_clip(name, clips_dir=CLIPS_DIR):
+    width, height, fps, seconds, audio = CASES[name]
+    path = os.path.join(clips_dir, f"{name}.mp4")
+    if os.path.exists(path):
+        return path
+    os.makedirs(clips_dir, exist_ok=True)
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error', '-nostdin',
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}:duration={seconds}'
+    ]
+    if audio:
+        cmd += ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}', '-c:a', 'aac']
+    cmd += ['-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-shortest', f"{path}.tmp.mp4"]
+    subprocess.run(cmd, check=True)
+    os.replace(f"{path}.tmp.mp4", path)
+    return path
+
+def peak_rss_mb():
+    # Peak resident memory of this process and of its largest ffmpeg child
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+def probe(path):
+    media = make.probe_media(path)
+    return media['fps'], media['frames'], (media['width'], media['height'])
+
+def time_stages(editor, path, work_dir):
+    # Each stage on its own, so a regression can be traced to decode, composite or encode
+    fps, total_frames, source_size = probe(path)
+    stages = {}
+
+    make._background_canvases.clear()
+    make._title_layers.clear()
+    start = time.perf_counter()
+    layer = editor.add_text_to_canvas(np.array(editor.background_canvas(None)),
+                                      "Benchmark de título com várias palavras", 'top')
+    stages['background_title_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    area = (0, 350, editor.output_size[0], editor.output_size[1] - 750)
+    effects = editor.create_effects(path)
+    margins = effects.margins(source_size)
+    decoder = editor.create_decoder(path, source_size, area[2:], margins, mirror=effects.mirror)
+    frames = []
+    start = time.perf_counter()
+    decoder.start()
+    count = 0
+    while True:
+        index, frame = decoder.read()
+        if frame is None:
+            break
+        # With batch_frames set the decoder hands out (K, H, W, 3) blocks
+        for image in (frame if frame.ndim == 4 else (frame,)):
+            if len(frames) < STAGE_SAMPLE_FRAMES:
+                frames.append(image.copy())
+            count += 1
+        decoder.release(index)
+    decoder.close()
+    stages['decode_ms_per_frame'] = round((time.perf_counter() - start) * 1000 / max(1, count), 3)
+
+    compositor = make.StaticLayerCompositor(layer)
+    plan = make.ResizePlan((frames[0].shape[1], frames[0].shape[0]), area,
+                           (0, 0) if decoder.fitted else margins)
+    start = time.perf_counter()
+    for frame_idx, frame in enumerate(frames):
+        region = compositor.region(0, plan.dst_x, plan.dst_y, *plan.dsize)
+        plan.apply(frame, region)
+        effects.apply(region, frame_idx, mirror=not decoder.fitted)
+        buffer = compositor.finish(0)
+    stages['composite_ms_per_frame'] = round((time.perf_counter() - start) * 1000 / len(frames), 3)
+
+    encoder = editor.create_encoder(os.path.join(work_dir, 'encode_only.mp4'), fps)
+    start = time.perf_counter()
+    for _ in range(len(frames)):
+        encoder.write(buffer)
+    encoder.close()
+    stages['encode_ms_per_frame'] = round((time.perf_counter() - start) * 1000 / len(frames), 3)
+    return stages
+
+def run_case(name, editor_options, work_dir, clips_dir=CLIPS_DIR):
+    path = generate_clip(name, clips_dir)
+    editor = make.SimpleVideoEditor(**{'background_cache_dir': '', 'title_cache': None, **editor_options})
+    fps, total_frames, _ = probe(path)
+    output_path = os.path.join(work_dir, f"{name}_out.mp4")
+    events = []
+    messages = []
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    start = time.perf_counter()
+    success = editor.process_video_with_opencv(path, output_path, custom_title="Benchmark de título",
+                                               progress_callback=messages.append,
+                                               stop_event=threading.Event(),
+                                               event_callback=events.append)
+    elapsed = time.perf_counter() - start
+    timings = next((event['stages'] for event in events if event['type'] == 'stage_timings'), {})
+    # Rates are measured on the frames that reached the output, not on the probed source
+    frames = probe(output_path)[1] if os.path.exists(output_path) else 0
+
+    result = {
+        'case': name,
+        'input': dict(zip(('width', 'height', 'fps', 'seconds', 'audio'), CASES[name])),
+        'success': success,
+        'frames': frames,
+        'source_frames': total_frames,
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+        'realtime_factor': round(frames / fps / elapsed, 3) if elapsed and fps else 0.0,
+        'pipeline_ms_per_frame': {stage: stats['ms_per_frame'] for stage, stats in timings.items()},
+        'output_bytes': os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+    }
+    if not success:
+        result['errors'] = [message for message in messages if message.startswith('Erro')]
+    result['stages'] = time_stages(editor, path, work_dir)
+    rss = peak_rss_mb()
+    if rss:
+        result['peak_rss_mb'], result['peak_child_rss_mb'] = rss
+    return result
+
+def run_case_isolated(name, editor_options, work_dir, clips_dir=CLIPS_DIR):
+    # A fresh process per case keeps peak RSS and the module caches from leaking between cases
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_case, (name, editor_options, work_dir, clips_dir))
+
+def ffmpeg_version():
+    try:
+        output = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout
+        return output.splitlines()[0] if output else None
+    except OSError:
+        return None
+
+def compare_with_baseline(results, baseline, threshold):
+    previous = {case['case']: case for case in baseline.get('cases', [])}
+    regressions = []
+    for case in results['cases']:
+        base = previous.get(case['case'])
+        if not case['success']:
+            regressions.append(f"{case['case']}: render failed")
+            continue
+        if not base or not base.get('fps'):
+            continue
+        change = case['fps'] / base['fps'] - 1.0
+        case['baseline_fps'] = base['fps']
+        case['fps_change'] = round(change, 4)
+        if change < -threshold:
+            regressions.append(f"{case['case']}: {base['fps']:.2f} -> {case['fps']:.2f} fps ({change:+.1%})")
+    return regressions
+
+def parse_option(text):
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the video render path on synthetic clips")
+    parser.add_argument('--cases', help=f"Comma-separated cases ({', '.join(CASES)}; default: all)")
+    parser.add_argument('--quick', action='store_true', help=f"Only {', '.join(QUICK_CASES)}")
+    parser.add_argument('--clips-dir', default=CLIPS_DIR, help="Where generated clips are kept between runs")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file for the results")
+    parser.add_argument('--baseline', help="Results JSON of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Maximum allowed fps drop against the baseline (default: 0.10 = 10%%)")
+    parser.add_argument('--set', dest='options', action='append', default=[], type=parse_option,
+                        metavar='KEY=VALUE', help="SimpleVideoEditor option, e.g. --set encoder_preset=ultrafast")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if not make.SimpleVideoEditor().check_ffmpeg():
+        print("ffmpeg not found: it is needed to generate the benchmark clips.", file=sys.stderr)
+        return 2
+    names = QUICK_CASES if args.quick else tuple(CASES)
+    if args.cases:
+        names = [name.strip() for name in args.cases.split(',') if name.strip()]
+        unknown = [name for name in names if name not in CASES]
+        if unknown:
+            print(f"Unknown cases: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+
+    editor_options = dict(args.options)
+    work_dir = os.path.join(args.clips_dir, 'output')
+    os.makedirs(work_dir, exist_ok=True)
+    results = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'ffmpeg': ffmpeg_version(),
+        },
+        'editor_options': editor_options,
+        'cases': []
+    }
+    for name in names:
+        print(f"{name}...", end=' ', flush=True)
+        case = run_case_isolated(name, editor_options, work_dir, args.clips_dir)
+        results['cases'].append(case)
+        stages = ", ".join(f"{stage} {ms:.2f}" for stage, ms in case['pipeline_ms_per_frame'].items())
+        print(f"{case['fps']:.1f} fps ({stages} ms/frame), peak RSS {case.get('peak_rss_mb')} MB")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.threshold)
+        results['regressions'] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        status = 1 if regressions else 0
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Results saved to {args.output}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,61 +1,755 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
+import sys
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageTk
+from PIL import Image, ImageDraw, ImageFont
 import subprocess
-import tempfile
 import random
 import threading
+import multiprocessing
+import queue
+import signal
+import argparse
+import importlib
 from pathlib import Path
 import json
 import re
-from tqdm import tqdm
 import datetime
+import time
+import hashlib
+import sqlite3
+import shutil
+import heapq
+import collections
+import io
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    messagebox.showwarning("Aviso", "google-generativeai não instalado. Função de IA desabilitada.")
-
-try:
-    import speech_recognition as sr
-    from pydub import AudioSegment
-    SPEECH_AVAILABLE = True
-except ImportError:
-    SPEECH_AVAILABLE = False
-    messagebox.showwarning("Aviso", "speech_recognition ou pydub não instalados. Transcrição desabilitada.")
+CONFIG_FILE = 'video_editor_config.json'
+TITLE_CACHE_FILE = 'video_titles_cache.sqlite3'
+BACKGROUND_CACHE_DIR = '.background_cache'
+MANIFEST_FILE = 'editor_manifest.json'
+SEGMENT_MANIFEST_FILE = 'segments.json'
+# Shortest range worth its own process when one video is split across cores
+MIN_PARALLEL_SEGMENT_SECONDS = 10
+# The GUI drains worker events at this rate and keeps at most this many log lines
+UI_REFRESH_MS = 100
+LOG_MAX_LINES = 2000
+PREVIEW_WIDTH = 180
+# Bump whenever the title prompt changes so cached titles are regenerated
+TITLE_PROMPT_VERSION = 2
+TITLE_MAX_LENGTH = 40
+GEMINI_MODEL = "gemini-2.0-flash"
+TITLE_FONTS = ("arialbd.ttf", "arial.ttf")
+TRANSCRIPTION_SAMPLE_RATE = 16000
+AUDIO_SEGMENT_SECONDS = 5
+TRANSCRIPTION_ENGINES = ('google', 'vosk', 'none')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.webm', '.mov')
+BACKGROUND_EXTENSIONS = ('.png', '.jpeg', '.jpg')
+# Config keys forwarded to SimpleVideoEditor(); the GUI keeps them when re-saving the config
+EDITOR_OPTION_KEYS = ('encoder_preset', 'encoder_crf', 'encoder_threads',
+                      'decode_backend', 'decoder_threads', 'decode_buffer', 'pipeline_depth',
+                      'anti_plagiarism_effects', 'title_cache', 'force_regenerate_titles',
+                      'title_timeout', 'title_retries',
+                      'transcription_mode', 'transcription_window', 'transcription_scan',
+                      'transcription_engine', 'vosk_model_path',
+                      'gemini_endpoint', 'title_batch_size', 'title_candidates',
+                      'title_max_lines', 'background_cache_dir', 'background_seed', 'segment_seconds',
+                      'segment_workers', 'preview_fps', 'metrics', 'render_mode', 'batch_frames')
+# Editor options that do not change the rendered pixels, so changing them does not
+# invalidate videos already recorded as done in the job manifest
+MANIFEST_IGNORED_OPTIONS = ('encoder_threads', 'decoder_threads', 'decode_buffer', 'pipeline_depth',
+                            'title_cache', 'force_regenerate_titles', 'title_timeout', 'title_retries',
+                            'gemini_endpoint', 'title_batch_size', 'background_cache_dir',
+                            'preview_fps', 'metrics', 'batch_frames')
+# Perturbations the per-video seed may pick from; 'mirror' is opt-in
+ANTI_PLAGIARISM_EFFECTS = ('zoom', 'hue', 'noise', 'mirror')
+DEFAULT_EFFECTS = ('zoom', 'hue', 'noise')
+# Per-video metrics destinations: "log", "jsonl:<file>" and "prometheus:<port>"
+METRICS_SINKS = ('log', 'jsonl', 'prometheus')
+# Render stages in the order they are reported
+METRICS_STAGES = ('probe', 'title', 'background', 'decode', 'resize', 'effects', 'watermark', 'write', 'mux',
+                  'filtergraph')
+# "auto" renders videos without per-frame effects in a single ffmpeg filtergraph;
+# "frames" always composites the frames in Python
+RENDER_MODES = ('auto', 'frames')
+METRICS_FRAME_STAGES = ('decode', 'resize', 'effects', 'watermark', 'write')
+
+# Tk, Gemini and speech recognition are only imported when a code path needs them,
+# so headless batch runs start fast and work without a display.
+_optional_modules = {}
+
+def _optional_import(name):
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+def gemini_available():
+    return _optional_import('google.generativeai') is not None
+
+def speech_available():
+    return _optional_import('speech_recognition') is not None and _optional_import('pydub') is not None
+
+def vosk_available():
+    return _optional_import('vosk') is not None
+
+def _load_tk():
+    global tk, ttk, filedialog, messagebox, scrolledtext, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, scrolledtext
+    from PIL import ImageTk
+
+def content_fingerprint(path, sample_size=65536):
+    # Size plus a hash of the first, middle and last blocks: cheap even for multi-GB files
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        for offset in (0, max(0, size // 2 - sample_size // 2), max(0, size - sample_size)):
+            f.seek(offset)
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+def stable_seed(value):
+    return int(hashlib.sha1(str(value).encode()).hexdigest()[:8], 16)
+
+# ffmpeg/ffprobe are looked up once per process and every file is probed once,
+# keyed by its content fingerprint
+_tools = {}
+_media_probes = {}
+
+def tool_available(name):
+    if name not in _tools:
+        try:
+            subprocess.run([name, '-version'], capture_output=True, check=True)
+            _tools[name] = True
+        except (OSError, subprocess.CalledProcessError):
+            _tools[name] = False
+    return _tools[name]
+
+def parse_rate(value):
+    numerator, _, denominator = str(value or '0').partition('/')
+    try:
+        numerator, denominator = float(numerator), float(denominator or 1)
+    except ValueError:
+        return 0.0
+    return numerator / denominator if denominator else 0.0
+
+def media_info_from_ffprobe(data):
+    streams = data.get('streams', [])
+    video = next((stream for stream in streams if stream.get('codec_type') == 'video'
+                  and not stream.get('disposition', {}).get('attached_pic')), None)
+    if video is None:
+        return None
+    audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), None)
+    # avg_frame_rate is what the file really plays at; r_frame_rate is the timebase guess,
+    # and the two differ for variable frame rate sources
+    fps = parse_rate(video.get('avg_frame_rate')) or parse_rate(video.get('r_frame_rate'))
+    base_rate = parse_rate(video.get('r_frame_rate'))
+    duration = float(video.get('duration') or data.get('format', {}).get('duration') or 0)
+    rotation = 0
+    for side_data in video.get('side_data_list', []):
+        if 'rotation' in side_data:
+            rotation = int(float(side_data['rotation']))
+    rotation = (rotation or int(video.get('tags', {}).get('rotate', 0) or 0)) % 360
+    vfr = bool(fps and base_rate and abs(base_rate - fps) / fps > 0.01)
+    # width/height are the displayed size: ffmpeg rotates frames while decoding,
+    # but ffprobe reports the coded size
+    width, height = int(video.get('width') or 0), int(video.get('height') or 0)
+    if rotation % 180 == 90:
+        width, height = height, width
+    return {
+        'duration': duration,
+        'frames': int(video.get('nb_frames') or 0),
+        'fps': fps,
+        'vfr': vfr,
+        'width': width,
+        'height': height,
+        'rotation': rotation,
+        'has_audio': audio is not None,
+        'video_codec': video.get('codec_name'),
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'source': 'ffprobe'
+    }
+
+def ffprobe_media(path):
+    cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+        info = media_info_from_ffprobe(json.loads(result.stdout or b'{}')) if result.returncode == 0 else None
+    except (OSError, ValueError):
+        return None
+    if info is None:
+        return None
+    if not info['frames'] and not info['vfr']:
+        # Matroska/WebM headers carry no frame count; counting packets only demuxes the file
+        cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+               '-show_entries', 'stream=nb_read_packets', '-of', 'csv=p=0', path]
+        try:
+            output = subprocess.run(cmd, capture_output=True).stdout.decode('ascii', errors='ignore')
+            info['frames'] = int(output.strip().split(',')[0] or 0)
+        except (OSError, ValueError):
+            pass
+    if info['vfr'] or not info['frames']:
+        # Variable frame rate sources are decoded at a constant avg_frame_rate
+        info['frames'] = int(round(info['duration'] * info['fps']))
+    return info
+
+def opencv_media(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    rotation = int(cap.get(getattr(cv2, 'CAP_PROP_ORIENTATION_META', -1)) or 0) % 360
+    # The size comes from a decoded frame: depending on the version OpenCV may already have
+    # applied the rotation. If it has not, swap it to match what the ffmpeg decoder outputs
+    ret, frame = cap.read()
+    if ret:
+        height, width = frame.shape[:2]
+    else:
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if rotation % 180 == 90 and not cap.get(getattr(cv2, 'CAP_PROP_ORIENTATION_AUTO', -1)):
+        width, height = height, width
+    info = {
+        'duration': frames / fps if fps else 0.0,
+        'frames': frames,
+        'fps': fps,
+        'vfr': False,
+        'width': width,
+        'height': height,
+        'rotation': rotation,
+        'has_audio': None,
+        'video_codec': None,
+        'audio_codec': None,
+        'source': 'opencv'
+    }
+    cap.release()
+    return info
+
+def probe_media(path):
+    key = content_fingerprint(path)
+    if key not in _media_probes:
+        info = ffprobe_media(path) if tool_available('ffprobe') else None
+        info = info or opencv_media(path)
+        if info is None:
+            return None
+        _media_probes[key] = info
+    return _media_probes[key]
+
+class AntiPlagiarismEffects:
+    def __init__(self, seed, enabled=DEFAULT_EFFECTS):
+        self.seed = seed
+        rng = random.Random(seed)
+        contrast = 1.0 + rng.randint(-4, 3) * 0.015
+        brightness = (1.0 + rng.randint(-5, 4) * 0.02) * 5
+        self.crop_size = 1 if rng.randrange(3) == 0 else 0
+        self.zoom = rng.choice((0.0, 0.01, 0.02, 0.03)) if 'zoom' in enabled else 0.0
+        hue_degrees = rng.choice((-6, -4, -3, 3, 4, 6)) if 'hue' in enabled and rng.random() < 0.5 else 0
+        self.noise = rng.choice((0, 2, 3)) if 'noise' in enabled else 0
+        self.mirror = 'mirror' in enabled and rng.random() < 0.5
+
+        # Noise tiles hold values in [0, 2 * noise]; shifting the brightness down by
+        # `noise` keeps the mean unchanged while cv2.add saturates like the LUT does
+        offset = brightness - self.noise
+        self.matrix = None
+        if hue_degrees:
+            self.matrix = np.zeros((3, 4), dtype=np.float32)
+            self.matrix[:, :3] = contrast * self._hue_rotation_bgr(np.radians(hue_degrees))
+            self.matrix[:, 3] = offset
+        values = np.clip(np.round(np.arange(256) * contrast + offset), 0, 255)
+        self.lut = values.astype(np.uint8)
+        self._noise_tiles = {}
+        self._noise_blocks = {}
+        self._flip_scratch = {}
+
+    @staticmethod
+    def _hue_rotation_bgr(angle):
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        rgb = np.array([
+            [0.213 + cos_a * 0.787 - sin_a * 0.213, 0.715 - cos_a * 0.715 - sin_a * 0.715, 0.072 - cos_a * 0.072 + sin_a * 0.928],
+            [0.213 - cos_a * 0.213 + sin_a * 0.143, 0.715 + cos_a * 0.285 + sin_a * 0.140, 0.072 - cos_a * 0.072 - sin_a * 0.283],
+            [0.213 - cos_a * 0.213 - sin_a * 0.787, 0.715 - cos_a * 0.715 + sin_a * 0.715, 0.072 + cos_a * 0.928 + sin_a * 0.072],
+        ])
+        return rgb[::-1, ::-1]
+
+    def margins(self, source_size):
+        width, height = source_size
+        return (self.crop_size + int(width * self.zoom / 2),
+                self.crop_size + int(height * self.zoom / 2))
+
+    def _noise_tile(self, shape, frame_number):
+        tiles = self._noise_tiles.get(shape)
+        if tiles is None:
+            rng = np.random.default_rng(self.seed)
+            tiles = [rng.integers(0, 2 * self.noise + 1, size=shape, dtype=np.uint8) for _ in range(8)]
+            self._noise_tiles[shape] = tiles
+        return tiles[frame_number % len(tiles)]
+
+    def _noise_block(self, shape, first_frame, count):
+        # Tiles for consecutive frames laid out back to back, so any run of `count` frames
+        # is a contiguous slice that needs no copy
+        self._noise_tile(shape, 0)
+        tiles = self._noise_tiles[shape]
+        stack = self._noise_blocks.get(shape)
+        if stack is None or len(stack) < len(tiles) + count - 1:
+            stack = np.stack([tiles[i % len(tiles)] for i in range(len(tiles) + count - 1)])
+            self._noise_blocks[shape] = stack
+        offset = first_frame % len(tiles)
+        return stack[offset:offset + count].reshape(-1, shape[1], shape[2])
+
+    def _apply(self, image, noise, mirror):
+        if self.matrix is not None:
+            result = cv2.transform(image, self.matrix, dst=image)
+        else:
+            result = cv2.LUT(image, self.lut, dst=image)
+        if result is not image:
+            image[:] = result
+        if noise is not None:
+            cv2.add(image, noise, dst=image)
+        if self.mirror and mirror:
+            scratch = self._flip_scratch.get(image.shape)
+            if scratch is None:
+                scratch = self._flip_scratch[image.shape] = np.empty_like(image)
+            cv2.flip(image, 1, dst=scratch)
+            image[:] = scratch
+
+    def apply(self, region, frame_number, mirror=True):
+        noise = self._noise_tile(region.shape, frame_number) if self.noise else None
+        self._apply(region, noise, mirror)
+        return region
+
+    def apply_block(self, block, first_frame, mirror=True):
+        # A contiguous (K, H, W, 3) block is one tall image to OpenCV: every effect is a single
+        # call over all K frames, with the same per-pixel result as apply()
+        count, height, width = block.shape[:3]
+        noise = self._noise_block(block.shape[1:], first_frame, count) if self.noise else None
+        self._apply(block.reshape(count * height, width, 3), noise, mirror)
+        return block
+
+FALLBACK_TITLES = [
+    "Nada podia deter aquilo.",
+    "Isso não podia ter acontecido...",
+    "O que aconteceu vai te chocar.",
+    "Quando tudo parecia normal...",
+    "Você vai se arrepiar com isso.",
+    "Era para ser só mais um dia...",
+    "O erro que mudou tudo.",
+    "Isso saiu do controle.",
+    "Ninguém percebeu o que viria.",
+    "Uma decisão. Um destino."
+]
+
+class TitleCache:
+    def __init__(self, path=TITLE_CACHE_FILE, max_entries=5000, ttl_days=180):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl_days * 86400
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS titles (
+                    fingerprint TEXT NOT NULL,
+                    prompt_version INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    transcription TEXT,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (fingerprint, prompt_version)
+                )
+            """)
+
+    def _connect(self):
+        # Short-lived connections keep the cache safe to share between worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, fingerprint, prompt_version):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT title FROM titles WHERE fingerprint = ? AND prompt_version = ? AND created_at >= ?",
+                (fingerprint, prompt_version, now - self.ttl)
+            ).fetchone()
+            if row:
+                db.execute("UPDATE titles SET last_used = ? WHERE fingerprint = ? AND prompt_version = ?",
+                           (now, fingerprint, prompt_version))
+        return row[0] if row else None
+
+    def get_transcription(self, fingerprint):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT transcription FROM titles WHERE fingerprint = ? AND transcription IS NOT NULL "
+                "AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                (fingerprint, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, fingerprint, prompt_version, title, transcription=None):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?, ?, ?)",
+                       (fingerprint, prompt_version, title, transcription, now, now))
+            db.execute("DELETE FROM titles WHERE created_at < ?", (now - self.ttl,))
+            db.execute("""
+                DELETE FROM titles WHERE rowid NOT IN (
+                    SELECT rowid FROM titles ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+
+# Offline models take seconds to load, so each process loads a model once and every
+# video (and every title prefetch thread) shares it
+_vosk_models = {}
+_vosk_models_lock = threading.Lock()
+
+def load_vosk_model(model_path):
+    with _vosk_models_lock:
+        if model_path not in _vosk_models:
+            vosk = _optional_import('vosk')
+            vosk.SetLogLevel(-1)
+            _vosk_models[model_path] = vosk.Model(model_path)
+        return _vosk_models[model_path]
+
+class GoogleTranscriber:
+    def __init__(self, timeout=30, language="pt-BR"):
+        self.timeout = timeout
+        self.language = language
+
+    def available(self):
+        return speech_available()
+
+    def transcribe(self, chunks):
+        sr = _optional_import('speech_recognition')
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.timeout
+        audio = sr.AudioData(b''.join(chunks), TRANSCRIPTION_SAMPLE_RATE, 2)
+        return recognizer.recognize_google(audio, language=self.language)
+
+class VoskTranscriber:
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+    def available(self):
+        return vosk_available() and bool(self.model_path) and os.path.isdir(self.model_path)
+
+    def transcribe(self, chunks):
+        vosk = _optional_import('vosk')
+        recognizer = vosk.KaldiRecognizer(load_vosk_model(self.model_path), TRANSCRIPTION_SAMPLE_RATE)
+        parts = []
+        for chunk in chunks:
+            if recognizer.AcceptWaveform(bytes(chunk)):
+                parts.append(json.loads(recognizer.Result()).get('text', ''))
+        parts.append(json.loads(recognizer.FinalResult()).get('text', ''))
+        return ' '.join(part for part in parts if part)
+
+def create_transcriber(engine, model_path=None, timeout=30):
+    if engine == 'google':
+        return GoogleTranscriber(timeout)
+    if engine == 'vosk':
+        return VoskTranscriber(model_path)
+    return None
+
+def iter_audio_chunks(pcm, seconds=0.5):
+    step = int(TRANSCRIPTION_SAMPLE_RATE * seconds) * 2
+    view = memoryview(pcm)
+    for start in range(0, len(view), step):
+        yield view[start:start + step]
+
+def context_from_filename(path):
+    nome = os.path.basename(path)
+    nome = os.path.splitext(nome)[0]
+    nome = nome.replace('_', ' ').replace('-', ' ')
+    nome = re.sub(r'\d+', '', nome)
+    nome = nome.strip()
+    if len(nome.split()) >= 2 and not nome.lower().startswith("video"):
+        return nome.capitalize()
+    return None
+
+class TitleService:
+    def __init__(self, api_key, endpoint=None, timeout=30, retries=2, candidates=3):
+        genai = _optional_import('google.generativeai')
+        options = {'api_key': api_key}
+        if endpoint:
+            # e.g. "http://127.0.0.1:8080" to run against a local stub server
+            options.update(transport='rest', client_options={'api_endpoint': endpoint})
+        genai.configure(**options)
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.timeout = timeout
+        self.retries = retries
+        self.candidates = candidates
+
+    def build_prompt(self, contexts):
+        cenas = "\n".join(f"{i}: {json.dumps(contexto, ensure_ascii=False)}"
+                          for i, contexto in enumerate(contexts, 1))
+        return f"""
+            Crie títulos curtos e impactantes (máximo de {TITLE_MAX_LENGTH} caracteres) para cortes de cena de filme, destinados a redes sociais como o Kwai.
+
+            Cada título deve:
+            - Ser direto, chamativo e fácil de entender;
+            - Despertar curiosidade, tensão ou emoção;
+            - Refletir fielmente o conteúdo da sua cena, com base no contexto abaixo;
+            - Ser compatível com o estilo de vídeos virais curtos;
+            - Não conter emojis, hashtags ou explicações;
+            - Estar em português br, mesmo que o contexto esteja em outro idioma.
+
+            Sugira {self.candidates} títulos diferentes para cada cena.
+
+            Cenas:
+            {cenas}
+
+            Retorne apenas uma lista JSON com um item por cena, no formato:
+            [{{"id": 1, "titulos": ["...", "..."]}}]
+            """
+
+    @staticmethod
+    def pick_title(candidates):
+        for candidate in candidates:
+            if not isinstance(candidate, str):
+                continue
+            titulo = candidate.strip().strip('"“”').strip()
+            if titulo and len(titulo) <= TITLE_MAX_LENGTH:
+                return titulo
+        return None
+
+    def parse_titles(self, text, count):
+        text = re.sub(r'^```(?:json)?|```$', '', text.strip()).strip()
+        data = json.loads(text)
+        if isinstance(data, dict):
+            # The JSON mode often wraps the list in an object: use its single list value
+            lists = [value for value in data.values() if isinstance(value, list)]
+            data = lists[0] if len(lists) == 1 else None
+        if not isinstance(data, list):
+            raise ValueError("a resposta do Gemini não é uma lista de títulos")
+        titles = [None] * count
+        for position, item in enumerate(data):
+            if isinstance(item, dict):
+                try:
+                    index = int(item.get('id', position + 1)) - 1
+                except (TypeError, ValueError):
+                    index = position
+                candidates = item.get('titulos') or []
+                if isinstance(candidates, str):
+                    candidates = [candidates]
+            else:
+                index, candidates = position, item if isinstance(item, list) else [item]
+            if 0 <= index < count and titles[index] is None:
+                titles[index] = self.pick_title(candidates)
+        return titles
+
+    def generate_titles(self, contexts):
+        # One request for the whole batch; candidates that are too long are discarded
+        # locally instead of asking again
+        if not contexts:
+            return []
+        for tentativa in range(self.retries + 1):
+            try:
+                response = self.model.generate_content(
+                    self.build_prompt(contexts),
+                    generation_config={'response_mime_type': 'application/json'},
+                    request_options={'timeout': self.timeout}
+                )
+                return self.parse_titles(response.text, len(contexts))
+            except Exception:
+                if tentativa == self.retries:
+                    raise
+                time.sleep(2 ** tentativa)
+
+# genai keeps a single global configuration, so services are created once per process
+_title_services = {}
+_title_services_lock = threading.Lock()
+
+def get_title_service(api_key, endpoint=None, timeout=30, retries=2, candidates=3):
+    key = (api_key, endpoint, timeout, retries, candidates)
+    with _title_services_lock:
+        if key not in _title_services:
+            _title_services[key] = TitleService(api_key, endpoint, timeout, retries, candidates)
+        return _title_services[key]
+
+# Fonts, word widths and rendered titles are cached per process: a batch usually reuses
+# the same font sizes and often the same title
+_fonts = {}
+_text_widths = {}
+_title_layers = {}
+TITLE_OVERLAY_CACHE_SIZE = 64
+# Decoded, resized BGR backgrounds; with a cache dir they are memory-mapped .npy files,
+# so every worker process shares the same pages instead of decoding its own copy
+_background_canvases = {}
+
+def get_font(path, size):
+    key = (path, size)
+    if key not in _fonts:
+        try:
+            _fonts[key] = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+        except IOError:
+            _fonts[key] = None
+    return _fonts[key]
+
+def load_title_font(size):
+    for path in TITLE_FONTS:
+        font = get_font(path, size)
+        if font is not None:
+            return font
+    return get_font(None, size)
+
+def text_width(font, text):
+    key = (id(font), text)
+    if key not in _text_widths:
+        _text_widths[key] = font.getlength(text)
+    return _text_widths[key]
+
+def wrap_text(font, text, max_width):
+    # Line widths are sums of memoized word widths, so wrapping is linear in the text length
+    space = text_width(font, " ")
+    lines = []
+    for paragraph in text.split('\n'):
+        current, current_width = [], 0.0
+        for word in paragraph.split():
+            word_width = text_width(font, word)
+            width = current_width + space + word_width if current else word_width
+            if width <= max_width or not current:
+                current.append(word)
+                current_width = width
+            else:
+                lines.append(" ".join(current))
+                current, current_width = [word], word_width
+        if current:
+            lines.append(" ".join(current))
+    return lines or [""]
+
+def background_cache_key(background_path, size, pattern, seed):
+    if background_path and os.path.exists(background_path):
+        return ('file', os.path.abspath(background_path), os.stat(background_path).st_mtime_ns, size)
+    return ('pattern', pattern, seed, size)
+
+def blend_layer(canvas, layer, alpha, offset):
+    x, y = offset
+    height, width = alpha.shape[:2]
+    region = canvas[y:y + height, x:x + width]
+    blended = region.astype(np.uint16) * (255 - alpha) + layer * alpha + 127
+    region[:] = (blended // 255).astype(np.uint8)
+
+def fit_title_font(text, max_width, max_lines, max_size, min_size=20):
+    # Largest size (binary search) whose wrapped text fits in max_lines
+    low, high = min(min_size, max_size), max_size
+    while low < high:
+        size = (low + high + 1) // 2
+        if len(wrap_text(load_title_font(size), text, max_width)) <= max_lines:
+            low = size
+        else:
+            high = size - 1
+    return low
 
 class SimpleVideoEditor:
-    def __init__(self):
+    def __init__(self, encoder_preset='veryfast', encoder_crf=23, encoder_threads=0,
+                 decode_backend='auto', decoder_threads=0, decode_buffer=8, pipeline_depth=4,
+                 anti_plagiarism_effects=DEFAULT_EFFECTS, title_cache=TITLE_CACHE_FILE,
+                 force_regenerate_titles=False, title_timeout=30, title_retries=2,
+                 transcription_mode='loudest', transcription_window=30, transcription_scan=180,
+                 transcription_engine='google', vosk_model_path='',
+                 gemini_endpoint=None, title_batch_size=8, title_candidates=3, title_max_lines=0,
+                 background_cache_dir=BACKGROUND_CACHE_DIR, background_seed=0, segment_seconds=120,
+                 segment_workers=1, preview_fps=0, metrics='', render_mode='auto', batch_frames=1):
         self.output_size = (720, 1280)
         self.background_color = (240, 240, 240)
+        self.encoder_preset = encoder_preset
+        self.encoder_crf = encoder_crf
+        self.encoder_threads = encoder_threads
+        self.decode_backend = decode_backend
+        self.decoder_threads = decoder_threads
+        self.decode_buffer = decode_buffer
+        self.pipeline_depth = pipeline_depth
+        if isinstance(anti_plagiarism_effects, str):
+            anti_plagiarism_effects = [name.strip() for name in anti_plagiarism_effects.split(',')]
+        self.anti_plagiarism_effects = tuple(name for name in anti_plagiarism_effects if name)
+        self.title_cache = title_cache
+        self.force_regenerate_titles = force_regenerate_titles
+        self.title_timeout = title_timeout
+        self.title_retries = title_retries
+        self.transcription_mode = transcription_mode
+        self.transcription_window = transcription_window
+        self.transcription_scan = transcription_scan
+        self.transcriber = create_transcriber(transcription_engine, vosk_model_path, title_timeout)
+        self.gemini_endpoint = gemini_endpoint
+        self.title_batch_size = max(1, title_batch_size)
+        self.title_candidates = title_candidates
+        self.title_max_lines = title_max_lines
+        self.background_cache_dir = background_cache_dir
+        self.background_seed = background_seed
+        self.segment_seconds = segment_seconds
+        self.segment_workers = max(1, segment_workers or 1)
+        self.preview_fps = preview_fps
+        self.metrics = parse_metrics_spec(metrics)
+        self.render_mode = render_mode
+        self.batch_frames = max(1, batch_frames or 1)
+        self._title_cache = None
+
+    def get_title_cache(self):
+        if not self.title_cache:
+            return None
+        if self._title_cache is None:
+            try:
+                self._title_cache = TitleCache(self.title_cache)
+            except sqlite3.Error:
+                self.title_cache = None
+        return self._title_cache
         
-    def create_background_image(self, background_path=None, pattern="popcorn"):
+    def create_background_image(self, background_path=None, pattern="popcorn", seed=None):
         if background_path and os.path.exists(background_path):
-            bg = Image.open(background_path)
+            bg = Image.open(background_path).convert('RGB')
             bg = bg.resize(self.output_size, Image.Resampling.LANCZOS)
         else:
+            rng = np.random.RandomState(seed) if seed is not None else np.random
             bg = Image.new('RGB', self.output_size, self.background_color)
             if pattern == "popcorn":
-                self._add_popcorn_pattern(bg)
+                self._add_popcorn_pattern(bg, rng)
             elif pattern == "cinema":
-                self._add_cinema_pattern(bg)
+                self._add_cinema_pattern(bg, rng)
         return bg
+
+    def background_canvas(self, background_path=None, pattern="popcorn"):
+        # Read-only BGR canvas shared by every video using the same background
+        key = background_cache_key(background_path, self.output_size, pattern, self.background_seed)
+        if key in _background_canvases:
+            return _background_canvases[key]
+
+        cache_file = None
+        if self.background_cache_dir:
+            digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+            cache_file = os.path.join(self.background_cache_dir, f"{digest}.npy")
+            try:
+                canvas = np.load(cache_file, mmap_mode='r')
+                if canvas.shape == (self.output_size[1], self.output_size[0], 3):
+                    _background_canvases[key] = canvas
+                    return canvas
+            except (OSError, ValueError):
+                pass
+
+        background = self.create_background_image(background_path, pattern, self.background_seed)
+        canvas = cv2.cvtColor(np.array(background), cv2.COLOR_RGB2BGR)
+        if cache_file:
+            try:
+                os.makedirs(self.background_cache_dir, exist_ok=True)
+                temp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_file, 'wb') as f:
+                    np.save(f, canvas)
+                os.replace(temp_file, cache_file)
+                canvas = np.load(cache_file, mmap_mode='r')
+            except (OSError, ValueError):
+                pass
+        canvas.flags.writeable = False
+        _background_canvases[key] = canvas
+        return canvas
     
-    def _add_popcorn_pattern(self, img):
+    def _add_popcorn_pattern(self, img, rng=np.random):
         draw = ImageDraw.Draw(img)
         width, height = img.size
         for i in range(0, width, 100):
             for j in range(0, height, 120):
-                x = i + np.random.randint(-30, 30)
-                y = j + np.random.randint(-30, 30)
-                self._draw_popcorn_bucket(draw, x, y)
+                x = i + rng.randint(-30, 30)
+                y = j + rng.randint(-30, 30)
+                self._draw_popcorn_bucket(draw, x, y, rng)
     
-    def _draw_popcorn_bucket(self, draw, x, y):
+    def _draw_popcorn_bucket(self, draw, x, y, rng=np.random):
         bucket_points = [
             (x, y + 40), (x + 50, y + 40),
             (x + 45, y + 10), (x + 5, y + 10)
@@ -65,199 +759,171 @@ class SimpleVideoEditor:
             y_stripe = y + 15 + i * 8
             draw.line([(x + 5, y_stripe), (x + 45, y_stripe)], fill=(255, 255, 255), width=2)
         for i in range(4):
-            px = x + 10 + i * 8 + np.random.randint(-3, 3)
-            py = y - 5 + np.random.randint(-8, 5)
+            px = x + 10 + i * 8 + rng.randint(-3, 3)
+            py = y - 5 + rng.randint(-8, 5)
             draw.ellipse([px, py, px + 6, py + 6], fill=(255, 215, 0))
     
-    def _add_cinema_pattern(self, img):
+    def _add_cinema_pattern(self, img, rng=np.random):
         draw = ImageDraw.Draw(img)
         width, height = img.size
         for i in range(0, width, 80):
             for j in range(0, height, 100):
-                x = i + np.random.randint(-20, 20)
-                y = j + np.random.randint(-20, 20)
+                x = i + rng.randint(-20, 20)
+                y = j + rng.randint(-20, 20)
                 draw.ellipse([x, y, x + 30, y + 30], fill=(50, 50, 50))
                 draw.ellipse([x + 5, y + 5, x + 25, y + 25], fill=(200, 200, 200))
     
-    def apply_subtle_anti_plagiarism_effects(self, frame, frame_number, total_frames):
-        progress = frame_number / total_frames
-        video_seed = hash(str(total_frames)) % 100
-        brightness_factor = 1.0 + (video_seed % 10 - 5) * 0.02
-        contrast_factor = 1.0 + (video_seed % 8 - 4) * 0.015
-        frame = cv2.convertScaleAbs(frame, alpha=contrast_factor, beta=brightness_factor * 5)
-        if video_seed % 3 == 0:
-            h, w = frame.shape[:2]
-            crop_size = 1
-            frame = frame[crop_size:h-crop_size, crop_size:w-crop_size]
-        return frame
-    
+    def create_effects(self, input_path):
+        return AntiPlagiarismEffects(stable_seed(content_fingerprint(input_path)),
+                                     self.anti_plagiarism_effects)
+
     def check_ffmpeg(self):
-        try:
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-            return True
-        except:
-            return False
+        return tool_available('ffmpeg')
     
-    def extract_audio(self, video_path, temp_audio_path):
+    def extract_audio(self, video_path):
+        # Streams 16 kHz mono PCM from ffmpeg and keeps at most transcription_window seconds:
+        # either the start of the clip or its loudest segments within the scan range
+        rate = TRANSCRIPTION_SAMPLE_RATE
+        loudest = self.transcription_mode == 'loudest'
+        duration = max(self.transcription_window, self.transcription_scan) if loudest else self.transcription_window
+        cmd = [
+            'ffmpeg', '-nostdin', '-loglevel', 'error',
+            '-i', video_path,
+            '-vn', '-ac', '1', '-ar', str(rate),
+            '-t', str(duration),
+            '-f', 's16le', '-'
+        ]
         try:
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', video_path,
-                '-vn', '-acodec', 'pcm_s16le',
-                '-ar', '44100', '-ac', '1',
-                temp_audio_path
-            ]
-            subprocess.run(cmd, capture_output=True, check=True)
-            return True
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError:
+            return None
+
+        segment_bytes = rate * 2 * AUDIO_SEGMENT_SECONDS
+        keep = max(1, -(-self.transcription_window // AUDIO_SEGMENT_SECONDS))
+        segments = []
+        order = 0
+        try:
+            while True:
+                chunk = process.stdout.read(segment_bytes)
+                if not chunk:
+                    break
+                if loudest:
+                    samples = np.frombuffer(chunk, dtype='<i2', count=len(chunk) // 2).astype(np.float32)
+                    rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+                    if len(segments) < keep:
+                        heapq.heappush(segments, (rms, order, chunk))
+                    else:
+                        heapq.heappushpop(segments, (rms, order, chunk))
+                else:
+                    segments.append((0.0, order, chunk))
+                order += 1
         except Exception:
-            return False
+            segments = []
+        finally:
+            process.stdout.close()
+            process.wait()
+
+        if not segments:
+            return None
+        return b''.join(chunk for _, _, chunk in sorted(segments, key=lambda segment: segment[1]))
     
-    def transcribe_audio(self, audio_path):
-        if not SPEECH_AVAILABLE:
+    def transcribe_audio(self, audio):
+        if self.transcriber is None or not self.transcriber.available() or not audio:
             return ""
         
-        recognizer = sr.Recognizer()
         try:
-            with sr.AudioFile(audio_path) as source:
-                audio = recognizer.record(source)
-            transcription = recognizer.recognize_google(audio, language="pt-BR")
-            return transcription
+            if not isinstance(audio, (bytes, bytearray)):
+                audio = self.extract_audio(audio)
+                if not audio:
+                    return ""
+            return self.transcriber.transcribe(iter_audio_chunks(audio)).strip()
         except Exception:
             return ""
     
-    def extract_context_from_scene(self, video_path, api_key):
-        fallback_titles = [
-            "Nada podia deter aquilo.",
-            "Isso não podia ter acontecido...",
-            "O que aconteceu vai te chocar.",
-            "Quando tudo parecia normal...",
-            "Você vai se arrepiar com isso.",
-            "Era para ser só mais um dia...",
-            "O erro que mudou tudo.",
-            "Isso saiu do controle.",
-            "Ninguém percebeu o que viria.",
-            "Uma decisão. Um destino."
-        ]
-
-        def gerar_prompt(com_base):
-            return f"""
-            Crie um título curto e impactante (máximo de 40 caracteres) para um corte de cena de filme, destinado a redes sociais como o Kwai.
-
-            O título deve:
-            - Ser direto, chamativo e fácil de entender;
-            - Despertar curiosidade, tensão ou emoção;
-            - Refletir fielmente o conteúdo da cena, com base no conteúdo abaixo;
-            - Ser compatível com o estilo de vídeos virais curtos;
-            - Não conter emojis, hashtags ou explicações.
-
-            Contexto: "{com_base}"
-
-            Retorne apenas o título e caso esteja em outro idioma, traduzir para o português br.
-            """
-
-        def limpar_nome_arquivo(path):
-            nome = os.path.basename(path)
-            nome = os.path.splitext(nome)[0]
-            nome = nome.replace('_', ' ').replace('-', ' ')
-            nome = re.sub(r'\d+', '', nome)
-            nome = nome.strip()
-            if len(nome.split()) >= 2 and not nome.lower().startswith("video"):
-                return nome.capitalize()
-            return None
+    def prepare_title(self, video_path):
+        # Cache lookup and transcription; the titles themselves are requested in batches
+        request = {'video_path': video_path, 'fingerprint': None, 'transcription': None,
+                   'context': None, 'title': None}
+        cache = self.get_title_cache()
+        if cache:
+            request['fingerprint'] = content_fingerprint(video_path)
+            if not self.force_regenerate_titles:
+                try:
+                    request['title'] = cache.get(request['fingerprint'], TITLE_PROMPT_VERSION)
+                    if request['title']:
+                        return request
+                    # A new prompt version can still reuse the transcription of an older run
+                    request['transcription'] = cache.get_transcription(request['fingerprint'])
+                except sqlite3.Error:
+                    pass
 
-        if not GEMINI_AVAILABLE or not api_key:
-            return random.choice(fallback_titles)
+        if request['transcription'] is None:
+            request['transcription'] = self.transcribe_audio(video_path)
+        request['context'] = request['transcription'] or context_from_filename(video_path)
+        return request
 
-        temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_audio_path = temp_audio.name
-        temp_audio.close()
+    def generate_titles(self, requests, api_key):
+        pending = [request for request in requests
+                   if request and not request['title'] and request['context']]
+        if pending:
+            service = get_title_service(api_key, self.gemini_endpoint, self.title_timeout,
+                                        self.title_retries, self.title_candidates)
+            cache = self.get_title_cache()
+            for start in range(0, len(pending), self.title_batch_size):
+                batch = pending[start:start + self.title_batch_size]
+                try:
+                    titles = service.generate_titles([request['context'] for request in batch])
+                except Exception:
+                    continue
+                for request, title in zip(batch, titles):
+                    if not title:
+                        continue
+                    request['title'] = title
+                    if cache and request['fingerprint']:
+                        try:
+                            cache.put(request['fingerprint'], TITLE_PROMPT_VERSION, title,
+                                      request['transcription'])
+                        except sqlite3.Error:
+                            pass
+        return [request['title'] if request and request['title'] else random.choice(FALLBACK_TITLES)
+                for request in requests]
 
+    def extract_context_from_scene(self, video_path, api_key):
+        if not gemini_available() or not api_key:
+            return random.choice(FALLBACK_TITLES)
         try:
-            genai.configure(api_key=api_key)
-            gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-            
-            if not self.extract_audio(video_path, temp_audio_path):
-                context = limpar_nome_arquivo(video_path)
-                if context:
-                    prompt = gerar_prompt(context)
-                    response = gemini_model.generate_content(prompt)
-                    title = response.text.strip()
-                    if title and len(title) <= 40:
-                        return title
-                return random.choice(fallback_titles)
-
-            transcription = self.transcribe_audio(temp_audio_path)
-            if not transcription:
-                context = limpar_nome_arquivo(video_path)
-                if context:
-                    prompt = gerar_prompt(context)
-                    response = gemini_model.generate_content(prompt)
-                    title = response.text.strip()
-                    if title and len(title) <= 40:
-                        return title
-                return random.choice(fallback_titles)
-
-            prompt = gerar_prompt(transcription)
-            response = gemini_model.generate_content(prompt)
-            title = response.text.strip()
-
-            if title and len(title) <= 40:
-                return title
-            else:
-                context = limpar_nome_arquivo(video_path)
-                if context:
-                    prompt = gerar_prompt(context)
-                    response = gemini_model.generate_content(prompt)
-                    title = response.text.strip()
-                    if title and len(title) <= 40:
-                        return title
-                return random.choice(fallback_titles)
-
+            return self.generate_titles([self.prepare_title(video_path)], api_key)[0]
         except Exception:
-            return random.choice(fallback_titles)
-        finally:
-            try:
-                if os.path.exists(temp_audio_path):
-                    os.remove(temp_audio_path)
-            except:
-                pass
+            return random.choice(FALLBACK_TITLES)
     
-    def add_text_to_image(self, img, text, position='top', font_size=50):
-        draw = ImageDraw.Draw(img)
-        img_width, img_height = img.size
-
-        try:
-            font = ImageFont.truetype("arialbd.ttf", font_size)
-        except IOError:
-            try:
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except IOError:
-                font = ImageFont.load_default()
+    def add_text_to_canvas(self, canvas, text, position='top', font_size=50, max_lines=None):
+        max_lines = self.title_max_lines if max_lines is None else max_lines
+        size = (canvas.shape[1], canvas.shape[0])
+        key = (text, position, font_size, max_lines, size)
+        if key not in _title_layers:
+            if len(_title_layers) >= TITLE_OVERLAY_CACHE_SIZE:
+                _title_layers.pop(next(iter(_title_layers)))
+            overlay, offset = self.render_title_overlay(size, text, position, font_size, max_lines)
+            if overlay is None:
+                _title_layers[key] = None
+            else:
+                rgba = np.array(overlay)
+                _title_layers[key] = (cv2.cvtColor(rgba[:, :, :3], cv2.COLOR_RGB2BGR).astype(np.uint16),
+                                      rgba[:, :, 3:].astype(np.uint16), offset)
+        if _title_layers[key] is not None:
+            blend_layer(canvas, *_title_layers[key])
+        return canvas
 
+    def render_title_overlay(self, size, text, position='top', font_size=50, max_lines=0):
+        img_width, img_height = size
         text = text.upper()
         max_line_width_for_wrap = img_width - 80
 
-        temp_img = Image.new('RGBA', (1, 1), (0, 0, 0, 0))
-        temp_draw = ImageDraw.Draw(temp_img)
-
-        processed_lines = []
-        for line in text.split('\n'):
-            words = line.split()
-            current_line = ""
-            for word in words:
-                test_line = current_line + " " + word if current_line else word
-                width = temp_draw.textbbox((0, 0), test_line, font=font)[2]
-                if width <= max_line_width_for_wrap:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        processed_lines.append(current_line)
-                    current_line = word
-            if current_line:
-                processed_lines.append(current_line)
-
-        if not processed_lines:
-            processed_lines = [""]
+        if max_lines:
+            font_size = fit_title_font(text, max_line_width_for_wrap, max_lines, font_size)
+        font = load_title_font(font_size)
+        processed_lines = wrap_text(font, text, max_line_width_for_wrap)
 
         line_height = font.getmetrics()[0] + font.getmetrics()[1]
         total_text_height = len(processed_lines) * (line_height + 10) - 10
@@ -267,12 +933,12 @@ class SimpleVideoEditor:
         else:
             start_y = (img_height - total_text_height) // 2 + 50
 
-        overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
+        overlay = Image.new('RGBA', size, (0, 0, 0, 0))
         draw_overlay = ImageDraw.Draw(overlay)
 
         y = start_y
         for line in processed_lines:
-            line_width = temp_draw.textbbox((0, 0), line, font=font)[2]
+            line_width = draw_overlay.textbbox((0, 0), line, font=font)[2]
             x = (img_width - line_width) // 2
 
             draw_overlay.text(
@@ -285,186 +951,1741 @@ class SimpleVideoEditor:
             )
             y += line_height + 10
 
-        img.paste(overlay, (0, 0), overlay)
-        return img
+        # Only the area covered by text is kept, so pasting a cached title is cheap
+        bbox = overlay.getbbox()
+        if bbox is None:
+            return None, (0, 0)
+        return overlay.crop(bbox), bbox[:2]
 
     def process_video_with_opencv(self, input_path, output_path, background_image=None, 
                                  custom_title=None, title_position='top', anti_plagiarism=True,
-                                 api_key=None, progress_callback=None, stop_event=None):
-        has_ffmpeg = self.check_ffmpeg()
-        temp_video = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-        temp_video_path = temp_video.name
-        temp_video.close()
-        
+                                 api_key=None, progress_callback=None, stop_event=None,
+                                 event_callback=None, title_seconds=None):
         try:
-            success = self._process_video_frames(
-                input_path, temp_video_path, background_image, 
+            return self._process_video_frames(
+                input_path, output_path, background_image, 
                 custom_title, title_position, anti_plagiarism, api_key, 
-                progress_callback, stop_event
+                progress_callback, stop_event, event_callback, title_seconds
             )
-            if not success:
-                return False
-            
-            if has_ffmpeg and not stop_event.is_set():
-                self._add_audio_with_ffmpeg(input_path, temp_video_path, output_path)
-            else:
-                import shutil
-                shutil.move(temp_video_path, output_path)
-            return True
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Erro: {e}")
             return False
-        finally:
-            try:
-                if os.path.exists(temp_video_path):
-                    os.remove(temp_video_path)
-            except:
-                pass
-        
-    def _add_audio_with_ffmpeg(self, original_video, processed_video, output_path):
-        try:
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', processed_video,
-                '-i', original_video,
-                '-c:v', 'copy',
-                '-c:a', 'aac',
-                '-map', '0:v:0',
-                '-map', '1:a:0',
-                '-vsync', '0',
-                '-async', '1',
-                '-strict', '-2',
-                output_path
-            ]
-            subprocess.run(cmd, capture_output=True, text=True)
-        except Exception:
-            import shutil
-            shutil.copy2(processed_video, output_path)
+
+    def probe_media(self, input_path):
+        return probe_media(input_path)
+
+    def create_encoder(self, output_path, fps, audio_source=None):
+        if self.check_ffmpeg():
+            return FFmpegPipeEncoder(output_path, self.output_size, fps, audio_source,
+                                     preset=self.encoder_preset, crf=self.encoder_crf,
+                                     threads=self.encoder_threads)
+        return OpenCVEncoder(output_path, self.output_size, fps)
+
+    def create_decoder(self, input_path, source_size, fit_size=None, margins=(0, 0), mirror=False,
+                       start_frame=0, fps=None, constant_fps=False):
+        backend = self.decode_backend
+        if backend == 'auto':
+            backend = 'ffmpeg' if self.check_ffmpeg() else 'opencv'
+        if backend == 'ffmpeg':
+            # Half a frame early, so rounding never drops the first frame of the range
+            start_time = max(0.0, (start_frame - 0.5) / fps) if start_frame and fps else 0.0
+            # decode_buffer counts frames, so batched slots hold the same number in fewer blocks
+            return FFmpegPipeDecoder(input_path, source_size, fit_size, margins, mirror,
+                                     threads=self.decoder_threads,
+                                     slots=self.decode_buffer // self.batch_frames,
+                                     start_time=start_time, fps=fps if constant_fps else None,
+                                     batch=self.batch_frames)
+        return ThreadedCaptureDecoder(input_path, slots=self.decode_buffer, start_frame=start_frame)
 
     def _process_video_frames(self, input_path, output_path, background_image=None, 
                              custom_title=None, title_position='top', anti_plagiarism=True,
-                             api_key=None, progress_callback=None, stop_event=None):
+                             api_key=None, progress_callback=None, stop_event=None,
+                             event_callback=None, title_seconds=None):
         
-        cap = cv2.VideoCapture(input_path)
+        metrics = RenderMetrics(enabled=bool(self.metrics))
+        tick = metrics.clock
+        started = tick()
+        media = self.probe_media(input_path)
         
-        if not cap.isOpened():
+        if media is None:
             if progress_callback:
                 progress_callback(f"Erro: Não foi possível abrir o vídeo {input_path}")
             return False
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        background = self.create_background_image(background_image)
+        # The frame count only drives progress and segment planning: frames are rendered until EOF
+        fps = media['fps']
+        total_frames = media['frames']
+        source_size = (media['width'], media['height'])
+        metrics.add('probe', tick() - started)
         
+        start = tick()
         if custom_title:
             title_text = custom_title
         else:
             title_text = self.extract_context_from_scene(input_path, api_key)
+        # A title prefetched while earlier videos rendered is charged the time it took then
+        metrics.add('title', tick() - start + (title_seconds or 0.0))
         
         if progress_callback:
             progress_callback(f"Título: {title_text}")
+        if event_callback:
+            event_callback({'type': 'title', 'title': title_text})
         
-        background_with_title = self.add_text_to_image(
-            background.copy(), 
+        start = tick()
+        background = self.background_canvas(background_image)
+        bg_cv = self.add_text_to_canvas(
+            np.array(background), 
             title_text, 
             title_position,
             font_size=50
         )
+        metrics.add('background', tick() - start)
         
-        bg_cv = cv2.cvtColor(np.array(background_with_title), cv2.COLOR_RGB2BGR)
+        effects = self.create_effects(input_path) if anti_plagiarism else None
+        render = {'input_path': input_path, 'layer': bg_cv, 'source_size': source_size,
+                  'fps': fps, 'vfr': media['vfr'], 'total_frames': total_frames, 'effects': effects,
+                  'metrics': metrics}
+
+        segment_frames = int(round(self.segment_seconds * (fps or 30))) if self.segment_seconds else 0
+        segment_workers = self.segment_workers_available()
+        if segment_workers > 1:
+            # Enough ranges to keep every worker busy, but not so short that startup dominates
+            per_worker = max(-(-total_frames // segment_workers),
+                             int(MIN_PARALLEL_SEGMENT_SECONDS * (fps or 30)))
+            segment_frames = min(segment_frames, per_worker) if segment_frames else per_worker
+        segmented = bool(segment_frames and total_frames > segment_frames and self.check_ffmpeg())
+        resuming = segmented and os.path.exists(os.path.join(f"{output_path}.parts", SEGMENT_MANIFEST_FILE))
+        success = None
+        if (self.render_mode != 'frames' and effects is None and self.check_ffmpeg()
+                and not (segmented and (segment_workers > 1 or resuming))):
+            # Without per-frame effects the layout is static and ffmpeg can do the whole job,
+            # long videos included, unless their segments are resumed or split between processes
+            audio_source = input_path if media['has_audio'] is not False else None
+            success = self._render_filtergraph(render, output_path, audio_source,
+                                               progress_callback, stop_event, event_callback)
+        # None: not rendered by the filtergraph, which leaves some layouts to the frame path
+        if success is None and segmented:
+            starts = segment_starts(input_path, fps or 30, total_frames, segment_frames)
+            settings = {
+                'input': content_fingerprint(input_path),
+                'title': title_text,
+                'title_position': title_position,
+                'background': background_image,
+                'anti_plagiarism': anti_plagiarism,
+                'effects': list(self.anti_plagiarism_effects),
+                'encoder': [self.encoder_preset, self.encoder_crf],
+                'background_seed': self.background_seed,
+                'title_max_lines': self.title_max_lines,
+                'segment_starts': starts
+            }
+            success = self._render_segments(render, output_path, starts, settings, segment_workers,
+                                            progress_callback, stop_event, event_callback)
+        elif success is None:
+            # Without an audio track the encoder does not need to open the source a second time
+            audio_source = input_path if media['has_audio'] is not False else None
+            success, _ = self._render_frames(render, output_path, audio_source=audio_source,
+                                             progress_callback=progress_callback, stop_event=stop_event,
+                                             event_callback=event_callback)
+        if metrics.enabled:
+            self._report_metrics(metrics, input_path, output_path, success, tick() - started,
+                                 progress_callback, event_callback)
+        return success
+
+    def _report_metrics(self, metrics, input_path, output_path, success, elapsed,
+                        progress_callback=None, event_callback=None):
+        summary = metrics.summary(input_path, output_path, success, elapsed)
+        if progress_callback and 'log' in self.metrics:
+            progress_callback("Métricas: " + metrics_summary_line(summary))
+        if event_callback:
+            event_callback({'type': 'metrics', 'metrics': summary})
+
+    def _render_frames(self, render, output_path, audio_source=None, start_frame=0, frame_count=None,
+                       progress_callback=None, stop_event=None, event_callback=None, frame_callback=None):
+        input_path, source_size, effects = render['input_path'], render['source_size'], render['effects']
+        metrics = render.get('metrics') or RenderMetrics()
+        tick = metrics.clock
         
         video_area_top = 350
         video_area_bottom = 400
         video_area_height = self.output_size[1] - video_area_top - video_area_bottom
         video_area_width = self.output_size[0]
 
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, self.output_size)
+        margins = effects.margins(source_size) if effects else (0, 0)
+        decoder = self.create_decoder(input_path, source_size,
+                                      (video_area_width, video_area_height), margins,
+                                      mirror=bool(effects and effects.mirror),
+                                      start_frame=start_frame, fps=render['fps'],
+                                      constant_fps=render.get('vfr', False))
+        # Only the ffmpeg decoder delivers blocks; the pipeline depth is kept in frames
+        batch = decoder.batch
+        depth = max(1, self.pipeline_depth // batch)
+        compositor = StaticLayerCompositor(render['layer'], buffers=depth + 2, batch=batch)
+
+        video_area = (0, video_area_top, video_area_width, video_area_height)
+        plan = None
+        preview_interval = 1.0 / self.preview_fps if self.preview_fps and event_callback else None
+        next_preview = 0.0
+
+        def place(frame, region, frame_idx):
+            start = tick()
+            plan.apply(frame, region)
+            resized = tick()
+            metrics.add('resize', resized - start)
+            if effects:
+                # Effects use the frame number in the whole video, so segments match a single pass
+                effects.apply(region, start_frame + frame_idx, mirror=not decoder.fitted)
+            metrics.add('effects', tick() - resized)
+
+        def composite(frame, frame_idx, slot):
+            nonlocal plan, next_preview
+            source_size = (frame.shape[-2], frame.shape[-3])
+            if plan is None or plan.source_size != source_size:
+                # The ffmpeg decoder has already applied the anti-plagiarism crop and zoom
+                plan = ResizePlan(source_size, video_area, (0, 0) if decoder.fitted else margins)
+            region = compositor.region(slot, plan.dst_x, plan.dst_y, *plan.dsize)
+            if frame.ndim == 3:
+                place(frame, region, frame_idx)
+            elif effects and plan.dsize == plan.source_size:
+                # A block of frames that already fill the video area: effects run once over the
+                # whole block and a single copy places every frame
+                start = tick()
+                effects.apply_block(frame, start_frame + frame_idx, mirror=not decoder.fitted)
+                effected = tick()
+                metrics.add('effects', effected - start)
+                np.copyto(region[:len(frame)], frame)
+                metrics.add('resize', tick() - effected)
+            else:
+                for offset, image in enumerate(frame):
+                    place(image, region[offset], frame_idx + offset)
+            start = tick()
+            buffer = compositor.finish(slot)
+            if frame.ndim == 4:
+                buffer = buffer[:len(frame)]
+            metrics.add('watermark', tick() - start)
+            if preview_interval and time.monotonic() >= next_preview:
+                next_preview = time.monotonic() + preview_interval
+                self._publish_preview(buffer if buffer.ndim == 3 else buffer[-1], event_callback)
+            return buffer
+
+        def on_frame(frame_idx):
+            if frame_callback:
+                frame_callback(frame_idx)
+            else:
+                self._report_frame_progress(start_frame + frame_idx, render['total_frames'],
+                                            progress_callback, event_callback)
+
+        out = self.create_encoder(output_path, render['fps'], audio_source=audio_source)
+        pipeline = FramePipeline(decoder, composite, out, depth=depth)
+        status = pipeline.run(max_frames=frame_count, stop_event=stop_event, frame_callback=on_frame)
+        frames = pipeline.timers['encode'].frames
+        metrics.add_pipeline(pipeline, frame_bytes=self.output_size[0] * self.output_size[1] * 3)
         
-        frame_count = 0
-        for frame_idx in range(total_frames):
-            if stop_event and stop_event.is_set():
-                if progress_callback:
-                    progress_callback("Processamento interrompido pelo usuário.")
-                cap.release()
-                out.release()
+        if status == 'stopped':
+            if progress_callback:
+                progress_callback("Processamento interrompido pelo usuário.")
+            out.abort()
+            return False, frames
+        
+        if pipeline.error:
+            if progress_callback:
+                progress_callback(f"Erro no processamento dos quadros: {pipeline.error}")
+            out.abort()
+            return False, frames
+        
+        if not frames and start_frame:
+            # The frame count in the container overestimated the length of the video
+            out.abort()
+            return True, 0
+
+        start = tick()
+        success, error = out.close()
+        metrics.add('mux', tick() - start)
+        if not success and progress_callback:
+            progress_callback(f"Erro ao codificar o vídeo: {error}")
+        if decoder.error and progress_callback:
+            progress_callback(f"Erro ao decodificar o vídeo: {decoder.error}")
+        if progress_callback:
+            progress_callback("Tempo por estágio: " + pipeline.timings_summary())
+        if event_callback:
+            event_callback({'type': 'stage_timings', 'stages': pipeline.timings()})
+        
+        return success, frames
+
+    def _render_filtergraph(self, render, output_path, audio_source=None,
+                            progress_callback=None, stop_event=None, event_callback=None):
+        # One ffmpeg process scales and crops the source, overlays it on the background layer
+        # (title and watermark included) and encodes it; no frame passes through Python
+        metrics = render.get('metrics') or RenderMetrics()
+        start = metrics.clock()
+        video_area_top = 350
+        video_area_height = self.output_size[1] - video_area_top - 400
+        video_area = (0, video_area_top, self.output_size[0], video_area_height)
+        filters, (width, height) = fit_filters(render['source_size'], video_area[2:],
+                                               fps=render['fps'] if render.get('vfr') else None)
+        plan = ResizePlan((width, height), video_area)
+        compositor = StaticLayerCompositor(render['layer'])
+        if compositor.watermark_overlaps((plan.dst_y, plan.dst_y + height, plan.dst_x, plan.dst_x + width)):
+            # The watermark has to be drawn over the video: only the frame path does that
+            return None
+        if self.preview_fps and event_callback:
+            # No frame passes through Python here, so the preview is a single thumbnail
+            # of the layer over the first frame
+            capture = cv2.VideoCapture(render['input_path'])
+            ok, frame = capture.read()
+            capture.release()
+            if ok:
+                first = ResizePlan((frame.shape[1], frame.shape[0]), video_area)
+                first.apply(frame, compositor.region(0, first.dst_x, first.dst_y, *first.dsize))
+                self._publish_preview(compositor.finish(0), event_callback)
+
+        out_w, out_h = self.output_size
+        # The source drives the output: each decoded frame is padded to the output size and the
+        # layer, sent once with a transparent hole over the video area, is kept on top of it.
+        # The source pts are moved to start at 0 like the layer's, so no frame is shifted or dropped
+        graph = (f"[1:v:0]setpts=PTS-STARTPTS,{','.join(filters)},"
+                 f"pad={out_w}:{out_h}:{plan.dst_x}:{plan.dst_y},setsar=1[video];"
+                 f"[video][0:v]overlay=0:0,format=yuv420p[out]")
+        layer = np.empty((out_h, out_w, 4), dtype=np.uint8)
+        layer[..., :3] = compositor.layer
+        layer[..., 3] = 255
+        layer[plan.dst_y:plan.dst_y + height, plan.dst_x:plan.dst_x + width, 3] = 0
+        # Decoder, filtergraph and encoder threads all follow the per-worker share
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-nostdin',
+            '-f', 'rawvideo', '-pix_fmt', 'bgra', '-s', f'{out_w}x{out_h}',
+            '-framerate', f"{render['fps'] or 30}", '-i', 'pipe:0',
+            '-threads', str(self.decoder_threads), '-i', render['input_path'],
+            '-filter_complex_threads', str(self.decoder_threads),
+            '-filter_complex', graph,
+            '-map', '[out]'
+        ]
+        if audio_source:
+            cmd += ['-map', '1:a:0?', '-c:a', 'aac']
+        cmd += [
+            '-c:v', 'libx264', '-preset', str(self.encoder_preset), '-crf', str(self.encoder_crf),
+            '-threads', str(self.encoder_threads), '-r', f"{render['fps'] or 30}",
+            '-movflags', '+faststart',
+            '-progress', 'pipe:1', '-nostats',
+            output_path
+        ]
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        stderr = StderrTail(process.stderr)
+        try:
+            process.stdin.write(layer.data)
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+        stopped = False
+        frames = dropped = 0
+        for line in process.stdout:
+            key, _, value = line.decode('ascii', errors='ignore').strip().partition('=')
+            if key == 'frame':
+                frames = int(value or 0)
+                self._emit_progress(frames, render['total_frames'], progress_callback, event_callback)
+            elif key == 'drop_frames':
+                dropped = int(value or 0)
+            if stop_event is not None and stop_event.is_set():
+                stopped = True
+                process.kill()
+                break
+        process.stdout.close()
+        returncode = process.wait()
+        error = stderr.text()
+        metrics.add('filtergraph', metrics.clock() - start)
+        metrics.count('frames', frames)
+        metrics.count('decoded_frames', frames)
+        metrics.count('dropped_frames', dropped)
+
+        if stopped or returncode != 0:
+            try:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+            except OSError:
+                pass
+        if stopped:
+            if progress_callback:
+                progress_callback("Processamento interrompido pelo usuário.")
+            return False
+        if returncode != 0:
+            if progress_callback:
+                progress_callback(f"Erro ao renderizar com o ffmpeg: {error}")
+            return False
+        if progress_callback:
+            progress_callback(f"Renderizado pelo ffmpeg (filtergraph): {frames} quadros")
+        return True
+
+    def segment_workers_available(self):
+        # Batch workers are daemonic pool processes, which cannot start processes of their own
+        if self.segment_workers > 1 and not multiprocessing.current_process().daemon:
+            return self.segment_workers
+        return 1
+
+    def _render_segments(self, render, output_path, starts, settings, workers=1,
+                         progress_callback=None, stop_event=None, event_callback=None):
+        # Long videos are rendered in segments recorded in a manifest: an interrupted render
+        # resumes at the first missing segment and the segments are joined without re-encoding
+        segments = SegmentManifest(f"{output_path}.parts", settings)
+        count = len(starts)
+        if segments.done and progress_callback:
+            progress_callback(f"Retomando: {len(segments.done)}/{count} segmentos já renderizados")
+
+        ranges = [(index, starts[index], starts[index + 1] - starts[index] if index + 1 < count else None)
+                  for index in range(count) if not segments.is_done(index)]
+        if workers > 1 and len(ranges) > 1:
+            if progress_callback:
+                progress_callback(f"Renderizando {len(ranges)} segmentos em {min(workers, len(ranges))} processos")
+            success = self._render_segments_parallel(render, segments, ranges, workers,
+                                                     progress_callback, stop_event, event_callback)
+            if not success:
                 return False
-            
-            ret, frame = cap.read()
-            if not ret:
+        else:
+            for index, start_frame, frame_count in ranges:
+                if stop_event is not None and stop_event.is_set():
+                    if progress_callback:
+                        progress_callback("Processamento interrompido pelo usuário.")
+                    return False
+                success, frames = self._render_frames(
+                    render, segments.path(index),
+                    start_frame=start_frame,
+                    frame_count=frame_count,
+                    progress_callback=progress_callback, stop_event=stop_event, event_callback=event_callback
+                )
+                if not success:
+                    return False
+                segments.mark_done(index, frames)
+                if frame_count and frames < frame_count:
+                    break
+
+        metrics = render.get('metrics') or RenderMetrics()
+        start = metrics.clock()
+        success, error = join_segments(segments.completed_paths(), render['input_path'], output_path)
+        metrics.add('mux', metrics.clock() - start)
+        if not success:
+            if progress_callback:
+                progress_callback(f"Erro ao juntar os segmentos: {error}")
+            return False
+        segments.remove()
+        return True
+
+    def _render_segments_parallel(self, render, segments, ranges, workers,
+                                  progress_callback=None, stop_event=None, event_callback=None):
+        # Every process gets the same background layer and effects, and effects are keyed by the
+        # frame number in the whole video, so the ranges join seamlessly
+        ctx = multiprocessing.get_context('spawn')
+        progress_queue = ctx.Queue()
+        worker_stop = ctx.Event()
+        pool = ctx.Pool(processes=min(workers, len(ranges)),
+                        initializer=_segment_worker_init,
+                        initargs=(progress_queue, worker_stop))
+        results = [pool.apply_async(_segment_worker_run, (self, render, segments.path(index), index,
+                                                          start_frame, frame_count))
+                   for index, start_frame, frame_count in ranges]
+        done_frames = {index: 0 for index, _, _ in ranges}
+        already_done = sum(segments.done.values())
+        failed = False
+        try:
+            while True:
+                if stop_event is not None and stop_event.is_set() and not worker_stop.is_set():
+                    worker_stop.set()
+                try:
+                    index, frames = progress_queue.get(timeout=0.1)
+                    done_frames[index] = frames
+                    self._emit_progress(already_done + sum(done_frames.values()), render['total_frames'],
+                                        progress_callback, event_callback)
+                    continue
+                except queue.Empty:
+                    pass
+                for result in results:
+                    if result.ready() and not result.successful():
+                        failed = True
+                if failed or all(result.ready() for result in results):
+                    break
+            if failed:
+                worker_stop.set()
+            pool.close()
+            pool.join()
+        except BaseException:
+            worker_stop.set()
+            pool.terminate()
+            raise
+
+        success = True
+        for result in results:
+            try:
+                index, ok, frames, messages, totals = result.get(timeout=0)
+            except Exception as e:
+                if progress_callback:
+                    progress_callback(f"Erro ao renderizar segmento: {e}")
+                success = False
+                continue
+            if progress_callback and not (stop_event is not None and stop_event.is_set()):
+                for message in messages:
+                    progress_callback(message)
+            if render.get('metrics'):
+                render['metrics'].merge(totals)
+            if ok:
+                segments.mark_done(index, frames)
+            else:
+                success = False
+        if stop_event is not None and stop_event.is_set():
+            if progress_callback:
+                progress_callback("Processamento interrompido pelo usuário.")
+            return False
+        return success
+
+    def _publish_preview(self, frame, event_callback):
+        # The thumbnail is scaled and compressed here, on the render side, so the GUI only decodes it
+        height = frame.shape[0] * PREVIEW_WIDTH // frame.shape[1]
+        thumbnail = cv2.resize(frame, (PREVIEW_WIDTH, height), interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode('.jpg', thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if ok:
+            event_callback({'type': 'preview', 'image': data.tobytes()})
+
+    def _report_frame_progress(self, frame_idx, total_frames, progress_callback, event_callback):
+        if frame_idx % 10 == 0:
+            self._emit_progress(frame_idx, total_frames, progress_callback, event_callback)
+
+    def _emit_progress(self, frame_idx, total_frames, progress_callback, event_callback):
+        progress = min(100.0, (frame_idx / total_frames) * 100) if total_frames else 0.0
+        if progress_callback:
+            progress_callback(f"Processando: {progress:.1f}%")
+        if event_callback:
+            event_callback({'type': 'progress', 'frame': frame_idx,
+                            'total': total_frames, 'percent': progress})
+
+def fit_cover(source_size, area_size):
+    src_w, src_h = source_size
+    area_w, area_h = area_size
+    scale = max(area_w / src_w, area_h / src_h)
+    new_w, new_h = int(src_w * scale), int(src_h * scale)
+    crop_x = (new_w - area_w) // 2 if new_w > area_w else 0
+    crop_y = (new_h - area_h) // 2 if new_h > area_h else 0
+    return new_w, new_h, crop_x, crop_y, min(new_w, area_w), min(new_h, area_h)
+
+class ResizePlan:
+    def __init__(self, source_size, area_rect, margins=(0, 0)):
+        self.source_size = source_size
+        area_x, area_y, area_w, area_h = area_rect
+        margin_x, margin_y = margins
+        src_w = source_size[0] - 2 * margin_x
+        src_h = source_size[1] - 2 * margin_y
+        new_w, new_h, crop_x, crop_y, out_w, out_h = fit_cover((src_w, src_h), (area_w, area_h))
+
+        # Map the part of the scaled frame that survives the crop back to source pixels,
+        # so only that ROI is resized and nothing is scaled just to be thrown away
+        scale_x, scale_y = new_w / src_w, new_h / src_h
+        x0 = margin_x + int(round(crop_x / scale_x))
+        x1 = margin_x + min(src_w, int(round((crop_x + out_w) / scale_x)))
+        y0 = margin_y + int(round(crop_y / scale_y))
+        y1 = margin_y + min(src_h, int(round((crop_y + out_h) / scale_y)))
+        self.roi = (slice(y0, y1), slice(x0, x1))
+        self.dsize = (out_w, out_h)
+        self.dst_x = area_x + (area_w - out_w) // 2
+        self.dst_y = area_y + (area_h - out_h) // 2
+        self.copy_only = (x1 - x0, y1 - y0) == self.dsize
+
+    def apply(self, frame, dst):
+        source = frame[self.roi]
+        if self.copy_only:
+            np.copyto(dst, source)
+            return dst
+        result = cv2.resize(source, self.dsize, dst=dst, interpolation=cv2.INTER_AREA)
+        if result is not dst:
+            dst[:] = result
+        return dst
+
+class ThreadedDecoder:
+    fitted = False
+    batch = 1
+
+    def __init__(self, slots=8):
+        self.slots = max(2, slots)
+        self.frames = []
+        self.counts = []
+        self.error = None
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.timer = StageTimer('decode')
+
+    def _allocate(self, shape):
+        # With batch > 1 every slot is a (batch, H, W, 3) block
+        if self.batch > 1:
+            shape = (self.batch,) + tuple(shape)
+        self.frames = [np.empty(shape, dtype=np.uint8) for _ in range(self.slots)]
+        self.counts = [0] * self.slots
+        for index in range(self.slots):
+            self._free.put(index)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._open()
+            while not self._closed.is_set():
+                start = time.perf_counter()
+                index = self._free.get()
+                ready = time.perf_counter()
+                self.timer.blocked += ready - start
+                count = self._read_into(index) if index is not None else 0
+                if not count:
+                    break
+                self.timer.busy += time.perf_counter() - ready
+                self.timer.frames += count
+                self.counts[index] = count
+                self._ready.put(index)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.put(None)
+            self._release_source()
+
+    def read(self):
+        index = self._ready.get()
+        if index is None:
+            # Leave the end marker for any later read()
+            self._ready.put(None)
+            return None, None
+        if self.batch > 1:
+            return index, self.frames[index][:self.counts[index]]
+        return index, self.frames[index]
+
+    def release(self, index):
+        self._free.put(index)
+
+    def close(self):
+        self._closed.set()
+        self._free.put(None)
+        self._interrupt()
+        self._thread.join(timeout=5)
+
+    def _open(self):
+        pass
+
+    def _read_into(self, index):
+        raise NotImplementedError
+
+    def _interrupt(self):
+        pass
+
+    def _release_source(self):
+        pass
+
+class ThreadedCaptureDecoder(ThreadedDecoder):
+    def __init__(self, input_path, slots=8, start_frame=0):
+        super().__init__(slots)
+        self.input_path = input_path
+        self.start_frame = start_frame
+        self.cap = None
+
+    def _open(self):
+        self.cap = cv2.VideoCapture(self.input_path)
+        if self.start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        ret, frame = self.cap.read()
+        if not ret:
+            raise IOError(f"Não foi possível ler o vídeo {self.input_path}")
+        self._allocate(frame.shape)
+        self.frames[0][:] = frame
+        self._ready.put(self._free.get())
+
+    def _read_into(self, index):
+        ret, frame = self.cap.read(self.frames[index])
+        if not ret:
+            return False
+        if frame is not self.frames[index]:
+            self.frames[index] = frame
+        return True
+
+    def _release_source(self):
+        if self.cap is not None:
+            self.cap.release()
+
+def fit_filters(source_size, fit_size=None, margins=(0, 0), mirror=False, fps=None):
+    # ffmpeg filters matching ResizePlan: margin crop, optional mirror, then cover-fit
+    width, height = source_size
+    margin_x, margin_y = margins
+    # Variable frame rate sources are resampled to a constant rate, which is what the encoder writes
+    filters = [f'fps={fps}'] if fps else []
+    if margin_x or margin_y:
+        filters.append(f'crop=iw-{2 * margin_x}:ih-{2 * margin_y}:{margin_x}:{margin_y}')
+        width, height = width - 2 * margin_x, height - 2 * margin_y
+    if mirror:
+        filters.append('hflip')
+    if fit_size:
+        new_w, new_h, crop_x, crop_y, width, height = fit_cover((width, height), fit_size)
+        filters.append(f'scale={new_w}:{new_h}:flags=area')
+        if (width, height) != (new_w, new_h):
+            filters.append(f'crop={width}:{height}:{crop_x}:{crop_y}')
+    else:
+        filters.append(f'scale={width}:{height}')
+    return filters, (width, height)
+
+class FFmpegPipeDecoder(ThreadedDecoder):
+    def __init__(self, input_path, source_size, fit_size=None, margins=(0, 0), mirror=False,
+                 threads=0, slots=8, start_time=0.0, fps=None, batch=1):
+        super().__init__(slots)
+        self.batch = max(1, batch)
+        filters, (width, height) = fit_filters(source_size, fit_size, margins, mirror, fps)
+        self.fitted = bool(fit_size)
+        self.frame_shape = (height, width, 3)
+        self.cmd = [
+            'ffmpeg', '-loglevel', 'error', '-nostdin',
+            '-threads', str(threads)
+        ]
+        if start_time:
+            self.cmd += ['-ss', f'{start_time:.6f}']
+        self.cmd += [
+            '-i', input_path,
+            '-map', '0:v:0', '-an', '-sn',
+            '-vf', ','.join(filters)
+        ]
+        if start_time:
+            # The first frame lands slightly before zero; passthrough keeps ffmpeg from duplicating it
+            self.cmd += ['-vsync', 'passthrough']
+        self.cmd += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+        self.process = None
+
+    def _open(self):
+        self._allocate(self.frame_shape)
+        self.process = subprocess.Popen(self.cmd, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def _read_into(self, index):
+        # Fills a whole slot (one frame or a block of frames) and returns the complete frames read
+        view = memoryview(self.frames[index]).cast('B')
+        filled = 0
+        while filled < len(view):
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
                 break
-            
-            if anti_plagiarism:
-                frame = self.apply_subtle_anti_plagiarism_effects(frame, frame_idx, total_frames)
-            
-            original_height, original_width = frame.shape[:2]
-            
-            scale_width = video_area_width / original_width
-            scale_height = video_area_height / original_height
-            scale = max(scale_width, scale_height)
-            
-            new_width = int(original_width * scale)
-            new_height = int(original_height * scale)
-            
-            frame_resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            
-            if new_width > video_area_width:
-                crop_x = (new_width - video_area_width) // 2
-                frame_resized = frame_resized[:, crop_x:crop_x + video_area_width]
-                new_width = video_area_width
-                
-            if new_height > video_area_height:
-                crop_y = (new_height - video_area_height) // 2
-                frame_resized = frame_resized[crop_y:crop_y + video_area_height, :]
-                new_height = video_area_height
-            
-            final_frame = bg_cv.copy()
-            
-            x_offset = (video_area_width - new_width) // 2
-            y_offset = video_area_top + (video_area_height - new_height) // 2
-            
-            final_y_end = min(y_offset + new_height, video_area_top + video_area_height)
-            final_x_end = min(x_offset + new_width, video_area_width)
+            filled += count
+        return filled // (len(view) // self.batch)
 
-            new_height_adjusted = final_y_end - y_offset
-            new_width_adjusted = final_x_end - x_offset
+    def _interrupt(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
 
-            if new_height_adjusted < frame_resized.shape[0] or new_width_adjusted < frame_resized.shape[1]:
-                frame_resized = frame_resized[:new_height_adjusted, :new_width_adjusted]
+    def _release_source(self):
+        if self.process is not None:
+            self.process.stdout.close()
+            if self.process.wait() not in (0, -signal.SIGKILL) and self.error is None and not self._closed.is_set():
+                self.error = f"ffmpeg terminou com código {self.process.returncode}"
 
-            final_frame[y_offset:final_y_end, x_offset:final_x_end] = frame_resized
-            
-            font_cv = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale_cv = 2.0
-            thickness_cv = 3
-            text_watermark = "@impactofinal"
-            text_size_cv = cv2.getTextSize(text_watermark, font_cv, font_scale_cv, thickness_cv)[0]
-            text_x_cv = (self.output_size[0] - text_size_cv[0]) // 2
-            text_y_cv = self.output_size[1] - 50
-            
-            for dx in [-2, -1, 0, 1, 2]:
-                for dy in [-2, -1, 0, 1, 2]:
-                    if dx != 0 or dy != 0:
-                        cv2.putText(final_frame, text_watermark, (text_x_cv + dx, text_y_cv + dy),
-                                    font_cv, font_scale_cv, (0, 0, 0), thickness_cv)
-            
-            cv2.putText(final_frame, text_watermark, (text_x_cv, text_y_cv),
-                        font_cv, font_scale_cv, (0, 255, 255), thickness_cv)
-            
-            out.write(final_frame)
-            frame_count += 1
-            
-            if progress_callback and frame_idx % 10 == 0:
-                progress = (frame_idx / total_frames) * 100
-                progress_callback(f"Processando: {progress:.1f}%")
-        
-        cap.release()
-        out.release()
-        
+class StderrTail:
+    # Drains a process' stderr on a thread, so an ffmpeg that logs an error per broken frame
+    # never fills the pipe and blocks; only the last lines are kept for the error message
+    def __init__(self, stream, lines=20):
+        self.lines = collections.deque(maxlen=lines)
+        self._thread = threading.Thread(target=self._run, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _run(self, stream):
+        with stream:
+            for line in stream:
+                self.lines.append(line.decode('utf-8', errors='replace').rstrip())
+
+    def text(self):
+        self._thread.join()
+        return "\n".join(self.lines).strip()
+
+class FFmpegPipeEncoder:
+    def __init__(self, output_path, size, fps, audio_source=None, preset='veryfast', crf=23, threads=0):
+        self.output_path = output_path
+        width, height = size
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}', '-r', f'{fps or 30}',
+            '-i', '-'
+        ]
+        if audio_source:
+            # The trailing '?' keeps sources without an audio track from failing the mux
+            cmd += ['-i', audio_source, '-map', '0:v:0', '-map', '1:a:0?', '-c:a', 'aac']
+        cmd += [
+            '-c:v', 'libx264', '-preset', str(preset), '-crf', str(crf),
+            '-pix_fmt', 'yuv420p', '-threads', str(threads),
+            '-movflags', '+faststart',
+            output_path
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.stderr = StderrTail(self.process.stderr)
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+            return True
+        except (BrokenPipeError, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        success = self.process.wait() == 0
+        return success, self.stderr.text()
+
+    def abort(self):
+        self.process.kill()
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.wait()
+        self.stderr.text()
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError:
+            pass
+
+class OpenCVEncoder:
+    def __init__(self, output_path, size, fps):
+        self.output_path = output_path
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+
+    def write(self, frame):
+        self.writer.write(frame)
         return True
 
+    def close(self):
+        self.writer.release()
+        return True, ""
+
+    def abort(self):
+        self.writer.release()
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError:
+            pass
+
+def keyframe_times(input_path):
+    # Only keyframes are decoded, so this is fast even for long videos
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'info', '-hide_banner',
+        '-skip_frame', 'nokey', '-i', input_path,
+        '-map', '0:v:0', '-an', '-sn', '-vf', 'showinfo', '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+    except OSError:
+        return []
+    if result.returncode != 0:
+        return []
+    output = result.stderr.decode('utf-8', errors='replace')
+    return [float(value) for value in re.findall(r'pts_time:\s*(-?[\d.]+)', output)]
+
+def segment_starts(input_path, fps, total_frames, segment_frames):
+    # Range boundaries are moved to the nearest source keyframe, so no process decodes
+    # a GOP only to throw it away
+    starts = list(range(0, total_frames, segment_frames))
+    keyframes = sorted({int(round(time_ * fps)) for time_ in keyframe_times(input_path)})
+    keyframes = [frame for frame in keyframes if 0 < frame < total_frames]
+    if not keyframes:
+        return starts
+    snapped = [0]
+    for start in starts[1:]:
+        nearest = min(keyframes, key=lambda frame: abs(frame - start))
+        if abs(nearest - start) <= segment_frames // 2 and nearest > snapped[-1]:
+            snapped.append(nearest)
+        elif start > snapped[-1]:
+            snapped.append(start)
+    return snapped
+
+_segment_queue = None
+_segment_stop_event = None
+
+def _segment_worker_init(progress_queue, stop_event):
+    global _segment_queue, _segment_stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _segment_queue = progress_queue
+    _segment_stop_event = stop_event
+
+def _segment_worker_run(editor, render, output_path, index, start_frame, frame_count):
+    messages = []
+    # Only the frames of this range are counted here; the parent merges the totals
+    metrics = RenderMetrics(enabled=bool(render.get('metrics') and render['metrics'].enabled))
+    render = dict(render, metrics=metrics)
+
+    def frame_callback(frame_idx):
+        if frame_idx % 10 == 0:
+            _segment_queue.put((index, frame_idx + 1))
+
+    success, frames = editor._render_frames(render, output_path, start_frame=start_frame,
+                                            frame_count=frame_count,
+                                            progress_callback=messages.append,
+                                            stop_event=_segment_stop_event,
+                                            frame_callback=frame_callback)
+    _segment_queue.put((index, frames))
+    return index, success, frames, messages, metrics.totals()
+
+class SegmentManifest:
+    def __init__(self, directory, settings):
+        self.directory = directory
+        self.settings = settings
+        self.done = {}
+        manifest_path = os.path.join(directory, SEGMENT_MANIFEST_FILE)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('settings') == settings:
+                self.done = {int(index): frames for index, frames in data.get('done', {}).items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+        if not self.done and os.path.isdir(directory):
+            # Segments rendered with other settings cannot be reused
+            shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, index):
+        return os.path.join(self.directory, f"segment_{index:05d}.mp4")
+
+    def is_done(self, index):
+        return index in self.done and (self.done[index] == 0 or os.path.exists(self.path(index)))
+
+    def mark_done(self, index, frames):
+        self.done[index] = frames
+        manifest_path = os.path.join(self.directory, SEGMENT_MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'settings': self.settings, 'done': self.done}, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def completed_paths(self):
+        return [self.path(index) for index in sorted(self.done) if self.done[index]]
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def join_segments(segment_paths, audio_source, output_path):
+    list_path = f"{output_path}.concat.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error', '-nostdin',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-i', audio_source,
+        '-map', '0:v:0', '-map', '1:a:0?',
+        '-c:v', 'copy', '-c:a', 'aac',
+        '-movflags', '+faststart',
+        output_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+        return result.returncode == 0, result.stderr.decode('utf-8', errors='replace').strip()
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+
+class StageTimer:
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def as_dict(self):
+        per_frame = self.busy / self.frames * 1000 if self.frames else 0.0
+        return {'frames': self.frames, 'ms_per_frame': round(per_frame, 3),
+                'busy_s': round(self.busy, 3), 'starved_s': round(self.starved, 3),
+                'blocked_s': round(self.blocked, 3)}
+
+def parse_metrics_spec(spec):
+    # "log,jsonl:metrics.jsonl,prometheus:9464" -> {'log': '', 'jsonl': 'metrics.jsonl', ...}
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    sinks = {}
+    for item in spec or ():
+        kind, _, target = item.strip().partition(':')
+        if kind in METRICS_SINKS:
+            sinks[kind] = target.strip()
+    return sinks
+
+def _disabled_clock():
+    return 0.0
+
+class RenderMetrics:
+    # Stage totals and counters for one video. When disabled the clock is a constant and
+    # add() returns at once, so the frame loop only pays a few no-op calls per frame
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.clock = time.perf_counter if enabled else _disabled_clock
+        self.seconds = {}
+        self.counters = {}
+
+    def add(self, stage, seconds):
+        if self.enabled:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_pipeline(self, pipeline, frame_bytes):
+        # Decode and write already have busy timers in the pipeline stages
+        if not self.enabled:
+            return
+        decoded = pipeline.timers['decode'].frames
+        if pipeline.max_frames:
+            # Frames the decoder read ahead past the end of a segment were never meant to be written
+            decoded = min(decoded, pipeline.max_frames)
+        written = pipeline.timers['encode'].frames
+        self.add('decode', pipeline.timers['decode'].busy)
+        self.add('write', pipeline.timers['encode'].busy)
+        self.count('frames', written)
+        self.count('decoded_frames', decoded)
+        self.count('dropped_frames', max(0, decoded - written))
+        self.count('bytes_written', written * frame_bytes)
+
+    def totals(self):
+        return {'seconds': dict(self.seconds), 'counters': dict(self.counters)}
+
+    def merge(self, totals):
+        for stage, seconds in totals['seconds'].items():
+            self.add(stage, seconds)
+        for name, value in totals['counters'].items():
+            self.count(name, value)
+
+    def summary(self, input_path, output_path, success, elapsed):
+        frames = self.counters.get('frames', 0)
+        stages = sorted(self.seconds, key=lambda stage: METRICS_STAGES.index(stage)
+                        if stage in METRICS_STAGES else len(METRICS_STAGES))
+        return {
+            'video': input_path,
+            'output': output_path,
+            'success': success,
+            'seconds': round(elapsed, 3),
+            'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+            'frames': frames,
+            'decoded_frames': self.counters.get('decoded_frames', 0),
+            'dropped_frames': self.counters.get('dropped_frames', 0),
+            'bytes_in': os.path.getsize(input_path) if os.path.exists(input_path) else 0,
+            'bytes_written': self.counters.get('bytes_written', 0),
+            'bytes_out': os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+            'stages_s': {stage: round(self.seconds[stage], 4) for stage in stages},
+        }
+
+def metrics_summary_line(summary):
+    frames = summary['frames']
+    stages = ", ".join(
+        f"{stage} {seconds * 1000 / frames:.2f} ms/quadro" if frames and stage in METRICS_FRAME_STAGES
+        else f"{stage} {seconds:.2f} s"
+        for stage, seconds in summary['stages_s'].items())
+    return (f"{frames} quadros ({summary['dropped_frames']} descartados) em {summary['seconds']:.1f} s, "
+            f"{summary['fps']:.1f} quadros/s, saída {summary['bytes_out'] / 1e6:.1f} MB | {stages}")
+
+class JsonLinesMetricsSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, summary):
+        line = json.dumps({'time': datetime.datetime.now().isoformat(timespec='seconds'), **summary},
+                          ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+class PrometheusMetricsSink:
+    # Cumulative totals served as Prometheus text on http://127.0.0.1:<port>/metrics
+    def __init__(self, port, host='127.0.0.1'):
+        self.videos = {}
+        self.counters = {}
+        self.seconds = {}
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def export(self, summary):
+        status = 'done' if summary['success'] else 'failed'
+        with self._lock:
+            self.videos[status] = self.videos.get(status, 0) + 1
+            for name in ('frames', 'dropped_frames', 'bytes_in', 'bytes_written', 'bytes_out'):
+                self.counters[name] = self.counters.get(name, 0) + summary[name]
+            for stage, seconds in summary['stages_s'].items():
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def render(self):
+        with self._lock:
+            lines = ["# TYPE video_editor_videos_total counter"]
+            lines += [f'video_editor_videos_total{{status="{status}"}} {count}'
+                      for status, count in sorted(self.videos.items())]
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE video_editor_{name}_total counter", f"video_editor_{name}_total {value}"]
+            lines.append("# TYPE video_editor_stage_seconds_total counter")
+            lines += [f'video_editor_stage_seconds_total{{stage="{stage}"}} {seconds:.4f}'
+                      for stage, seconds in self.seconds.items()]
+        return "\n".join(lines) + "\n"
+
+# One endpoint per port for the whole process: the GUI starts a new batch on every run
+_prometheus_sinks = {}
+
+def create_metrics_sinks(spec):
+    # The "log" sink is written by the editor itself, into the job log
+    sinks = []
+    for kind, target in parse_metrics_spec(spec).items():
+        if kind == 'jsonl':
+            sinks.append(JsonLinesMetricsSink(target or 'metrics.jsonl'))
+        elif kind == 'prometheus':
+            port = int(target or 9464)
+            if port not in _prometheus_sinks:
+                _prometheus_sinks[port] = PrometheusMetricsSink(port)
+            sinks.append(_prometheus_sinks[port])
+    return sinks
+
+class FramePipeline:
+    def __init__(self, decoder, composite, encoder, depth=4):
+        self.decoder = decoder
+        self.composite = composite
+        self.encoder = encoder
+        self.depth = max(1, depth)
+        self.timers = {'decode': decoder.timer,
+                       'composite': StageTimer('composite'),
+                       'encode': StageTimer('encode')}
+        self.error = None
+        self.max_frames = None
+        self._abort = threading.Event()
+        self._encode_queue = queue.Queue(maxsize=self.depth)
+        self._free_slots = queue.Queue()
+        # The compositor owns depth + 2 buffers: one per queued frame, one being
+        # composited and one being written by the encoder
+        for slot in range(self.depth + 2):
+            self._free_slots.put(slot)
+
+    def _get(self, source):
+        while not self._abort.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, item):
+        while not self._abort.is_set():
+            try:
+                self._encode_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self._abort.set()
+
+    def _composite_stage(self, max_frames):
+        timer = self.timers['composite']
+        frame_idx = 0
+        try:
+            while not self._abort.is_set() and (not max_frames or frame_idx < max_frames):
+                start = time.perf_counter()
+                index, frame = self.decoder.read()
+                if frame is None:
+                    break
+                if frame.ndim == 4 and max_frames and frame_idx + len(frame) > max_frames:
+                    frame = frame[:max_frames - frame_idx]
+                ready = time.perf_counter()
+                slot = self._get(self._free_slots)
+                if slot is None:
+                    break
+                timer.starved += ready - start
+                start = time.perf_counter()
+                timer.blocked += start - ready
+                buffer = self.composite(frame, frame_idx, slot)
+                self.decoder.release(index)
+                count = len(buffer) if buffer.ndim == 4 else 1
+                timer.busy += time.perf_counter() - start
+                timer.frames += count
+                start = time.perf_counter()
+                if not self._put((frame_idx, slot, buffer)):
+                    break
+                timer.blocked += time.perf_counter() - start
+                frame_idx += count
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(None)
+
+    def _encode_stage(self, frame_callback):
+        timer = self.timers['encode']
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self._get(self._encode_queue)
+                if item is None:
+                    break
+                frame_idx, slot, buffer = item
+                ready = time.perf_counter()
+                timer.starved += ready - start
+                if not self.encoder.write(buffer):
+                    self._fail("falha ao enviar quadro ao codificador")
+                    break
+                count = len(buffer) if buffer.ndim == 4 else 1
+                timer.busy += time.perf_counter() - ready
+                timer.frames += count
+                self._free_slots.put(slot)
+                if frame_callback:
+                    for index in range(frame_idx, frame_idx + count):
+                        frame_callback(index)
+        except Exception as e:
+            self._fail(e)
+
+    def run(self, max_frames=None, stop_event=None, frame_callback=None):
+        self.max_frames = max_frames
+        self.decoder.start()
+        threads = [
+            threading.Thread(target=self._composite_stage, args=(max_frames,), daemon=True),
+            threading.Thread(target=self._encode_stage, args=(frame_callback,), daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        stopped = False
+        while any(thread.is_alive() for thread in threads):
+            if stop_event and stop_event.is_set():
+                stopped = True
+                self._abort.set()
+            threads[-1].join(timeout=0.1)
+        self.decoder.close()
+        for thread in threads:
+            thread.join()
+        return 'stopped' if stopped else 'done'
+
+    def timings(self):
+        return {name: timer.as_dict() for name, timer in self.timers.items()}
+
+    def timings_summary(self):
+        return ", ".join(f"{name} {stats['ms_per_frame']:.2f} ms/quadro"
+                         for name, stats in self.timings().items())
+
+class StaticLayerCompositor:
+    def __init__(self, static_layer, watermark_text="@impactofinal", buffers=1, batch=1):
+        # A copy, so every segment rendered from the same layer blends the watermark once
+        self.layer = static_layer.copy()
+        self.height, self.width = static_layer.shape[:2]
+        self.watermark_text = watermark_text
+        self._render_watermark()
+        self._blend_watermark(self.layer)
+        # Several output buffers let the encoder consume one frame while the next is composited;
+        # with batch > 1 each buffer is a (batch, H, W, 3) block of frames
+        if batch > 1:
+            self.buffers = [np.repeat(self.layer[None], batch, axis=0) for _ in range(buffers)]
+        else:
+            self.buffers = [self.layer.copy() for _ in range(buffers)]
+        self._last_rects = [None] * buffers
+
+    def _render_watermark(self):
+        font_cv = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale_cv = 2.0
+        thickness_cv = 3
+        text_size_cv = cv2.getTextSize(self.watermark_text, font_cv, font_scale_cv, thickness_cv)[0]
+        text_x_cv = (self.width - text_size_cv[0]) // 2
+        text_y_cv = self.height - 50
+
+        # Strokes are drawn black over whatever is below and the fill is drawn on top,
+        # so the whole watermark reduces to: out = below * keep + fill_color
+        stroke = np.full((self.height, self.width), 255, dtype=np.uint8)
+        fill = np.zeros((self.height, self.width), dtype=np.uint8)
+        for dx in [-2, -1, 0, 1, 2]:
+            for dy in [-2, -1, 0, 1, 2]:
+                if dx != 0 or dy != 0:
+                    cv2.putText(stroke, self.watermark_text, (text_x_cv + dx, text_y_cv + dy),
+                                font_cv, font_scale_cv, 0, thickness_cv)
+        cv2.putText(fill, self.watermark_text, (text_x_cv, text_y_cv),
+                    font_cv, font_scale_cv, 255, thickness_cv)
+
+        # Keep only the bounding box of the text so per-frame blends touch few pixels
+        ys, xs = np.nonzero((stroke < 255) | (fill > 0))
+        if len(ys) == 0:
+            self.watermark_rect = None
+            return
+        y0, y1, x0, x1 = int(ys.min()), int(ys.max()) + 1, int(xs.min()), int(xs.max()) + 1
+        self.watermark_rect = (y0, y1, x0, x1)
+        fill_alpha = fill[y0:y1, x0:x1, None].astype(np.float32) / 255.0
+        stroke_keep = stroke[y0:y1, x0:x1, None].astype(np.float32) / 255.0
+        self._watermark_keep = stroke_keep * (1.0 - fill_alpha)
+        self._watermark_color = np.array((0, 255, 255), dtype=np.float32) * fill_alpha + 0.5
+
+    def watermark_overlaps(self, rect):
+        if self.watermark_rect is None:
+            return False
+        wy0, wy1, wx0, wx1 = self.watermark_rect
+        y0, y1, x0, x1 = rect
+        return not (y0 >= wy1 or y1 <= wy0 or x0 >= wx1 or x1 <= wx0)
+
+    def _blend_watermark(self, target, rect=None):
+        if self.watermark_rect is None:
+            return
+        if rect is not None and not self.watermark_overlaps(rect):
+            return
+        wy0, wy1, wx0, wx1 = self.watermark_rect
+        region = target[..., wy0:wy1, wx0:wx1, :]
+        region[:] = region * self._watermark_keep + self._watermark_color
+
+    def region(self, slot, x_offset, y_offset, width, height):
+        buffer = self.buffers[slot]
+        rect = (y_offset, y_offset + height, x_offset, x_offset + width)
+        last_rect = self._last_rects[slot]
+        if last_rect is not None and rect != last_rect:
+            ly0, ly1, lx0, lx1 = last_rect
+            buffer[..., ly0:ly1, lx0:lx1, :] = self.layer[ly0:ly1, lx0:lx1]
+        self._last_rects[slot] = rect
+        return buffer[..., rect[0]:rect[1], rect[2]:rect[3], :]
+
+    def finish(self, slot=0):
+        buffer = self.buffers[slot]
+        self._blend_watermark(buffer, self._last_rects[slot])
+        return buffer
+
+def _run_batch_job(index, job, post, stop_event):
+    job = dict(job)
+    editor = SimpleVideoEditor(**job.pop('editor_options', {}))
+    name = os.path.basename(job['input_path'])
+    post(('status', index, 'processing', f"Processing {name}..."))
+
+    def progress_callback(message):
+        if not stop_event.is_set():
+            post(('message', index, f"[{name}] {message}"))
+
+    def event_callback(event):
+        if event['type'] == 'progress':
+            post(('progress', index, event['percent'], event.get('frame'), event.get('total')))
+        elif event['type'] == 'title':
+            post(('title', index, event['title']))
+        elif event['type'] == 'preview':
+            post(('preview', index, event['image']))
+        elif event['type'] == 'metrics':
+            post(('metrics', index, event['metrics']))
+
+    try:
+        success = editor.process_video_with_opencv(
+            progress_callback=progress_callback,
+            stop_event=stop_event,
+            event_callback=event_callback,
+            **job
+        )
+    except Exception as e:
+        post(('status', index, 'failed', f"❌ Error processing {name}: {e}"))
+        return 'failed'
+
+    if stop_event.is_set():
+        status, message = 'cancelled', f"Processing of {name} interrupted."
+    elif success:
+        status, message = 'done', f"✅ {name} processed successfully!"
+    else:
+        status, message = 'failed', f"❌ Error processing {name}"
+    post(('status', index, status, message))
+    return status
+
+_worker_queue = None
+_worker_stop_event = None
+
+def _batch_worker_init(progress_queue, stop_event):
+    global _worker_queue, _worker_stop_event
+    # Ctrl+C reaches the whole process group; the parent forwards it through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_queue = progress_queue
+    _worker_stop_event = stop_event
+
+def _batch_worker_run(index, job):
+    if _worker_stop_event.is_set():
+        _worker_queue.put(('status', index, 'cancelled', None))
+        return 'cancelled'
+    return _run_batch_job(index, job, _worker_queue.put, _worker_stop_event)
+
+class TitlePrefetcher:
+    def __init__(self, concurrency=4, deadline=300):
+        self.preparer = ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                           thread_name_prefix='title-prepare')
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                           thread_name_prefix='title-prefetch')
+        self.deadline = deadline
+        self._futures = {}
+        self._submitted = []
+
+    def prefetch(self, jobs, indexes=None):
+        # Videos are transcribed concurrently, in batch order, while earlier videos render;
+        # each group of title_batch_size videos then shares a single Gemini request
+        editors = {}
+        groups = {}
+        for index in (range(len(jobs)) if indexes is None else indexes):
+            job = jobs[index]
+            if job.get('custom_title') or not job.get('api_key'):
+                continue
+            options = job.get('editor_options', {})
+            key = json.dumps(options, sort_keys=True, default=str)
+            if key not in editors:
+                editors[key] = SimpleVideoEditor(**options)
+            groups.setdefault((key, job['api_key']), []).append(index)
+        # Checking for Gemini imports it, which custom-title runs never need
+        if not groups or not gemini_available():
+            return
+
+        for (key, api_key), indexes in groups.items():
+            editor = editors[key]
+            for start in range(0, len(indexes), editor.title_batch_size):
+                batch = indexes[start:start + editor.title_batch_size]
+                prepared = [self.preparer.submit(self._timed, editor.prepare_title,
+                                                 jobs[index]['input_path'])
+                            for index in batch]
+                future = self.executor.submit(self._request_titles, editor, api_key, prepared)
+                self._submitted += prepared + [future]
+                for position, index in enumerate(batch):
+                    self._futures[index] = (future, position)
+
+    @staticmethod
+    def _timed(function, *args):
+        start = time.perf_counter()
+        return function(*args), time.perf_counter() - start
+
+    @staticmethod
+    def _request_titles(editor, api_key, prepared):
+        requests, seconds = [], []
+        for future in prepared:
+            try:
+                request, elapsed = future.result()
+            except Exception:
+                request, elapsed = None, 0.0
+            requests.append(request)
+            seconds.append(elapsed)
+        titles, elapsed = TitlePrefetcher._timed(editor.generate_titles, requests, api_key)
+        # Each video is charged its own transcription and an equal share of the batch request
+        return [(title, prepare + elapsed / len(titles)) for title, prepare in zip(titles, seconds)]
+
+    def resolve(self, index, job, stop_event=None):
+        future, position = self._futures.pop(index, (None, None))
+        if future is None:
+            return job
+        waited = 0.0
+        while not future.done() and waited < self.deadline:
+            if stop_event is not None and stop_event.is_set():
+                return job
+            try:
+                future.result(timeout=0.2)
+            except Exception:
+                pass
+            waited += 0.2
+        try:
+            title, seconds = future.result(timeout=0)[position]
+        except Exception:
+            title, seconds = None, None
+        job = {**job, 'custom_title': title or random.choice(FALLBACK_TITLES)}
+        if seconds is not None:
+            job['title_seconds'] = seconds
+        return job
+
+    def shutdown(self):
+        # Executor.shutdown(cancel_futures=True) needs Python 3.9
+        for future in self._submitted:
+            future.cancel()
+        self.preparer.shutdown(wait=False)
+        self.executor.shutdown(wait=False)
+
+def job_settings_hash(job):
+    options = {key: value for key, value in job.get('editor_options', {}).items()
+               if key not in MANIFEST_IGNORED_OPTIONS}
+    settings = {
+        'custom_title': job.get('custom_title'),
+        'title_position': job.get('title_position'),
+        'anti_plagiarism': job.get('anti_plagiarism'),
+        'editor_options': options
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class JobManifest:
+    # Per-output record of what was rendered, so reruns only process failed or changed videos
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('jobs', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def key(job):
+        return os.path.basename(job['output_path'])
+
+    def prepare(self, job):
+        # Returns the job to run (reusing the recorded background and title when the input
+        # is unchanged) and whether its output is already up to date
+        fingerprint = content_fingerprint(job['input_path'])
+        settings = job_settings_hash(job)
+        entry = self.entries.get(self.key(job))
+        up_to_date = False
+        if entry and entry.get('fingerprint') == fingerprint:
+            # A video that got a fallback title is rendered again so the AI title is retried
+            retry_title = entry.get('fallback_title') and job.get('api_key') and not job.get('custom_title')
+            up_to_date = (entry.get('status') == 'done' and entry.get('settings') == settings
+                          and not retry_title
+                          and os.path.exists(job['output_path'])
+                          and os.path.getsize(job['output_path']) == entry.get('output_size'))
+            background = entry.get('background')
+            if background is None or os.path.exists(background):
+                job = {**job, 'background_image': background}
+            if not job.get('custom_title') and entry.get('title'):
+                job = {**job, 'custom_title': entry['title']}
+        if not up_to_date:
+            with self._lock:
+                self.entries[self.key(job)] = {
+                    'input': job['input_path'],
+                    'fingerprint': fingerprint,
+                    'settings': settings,
+                    'background': job.get('background_image'),
+                    'title': job.get('custom_title'),
+                    'status': 'pending',
+                    'updated_at': time.time()
+                }
+        return job, up_to_date
+
+    def record(self, job, status=None, title=None):
+        with self._lock:
+            entry = self.entries.get(self.key(job))
+            if entry is None:
+                return
+            if title:
+                # Fallback titles are not reused on later runs, like in the title cache
+                fallback = title in FALLBACK_TITLES
+                entry['title'] = None if fallback else title
+                entry['fallback_title'] = fallback
+            if status:
+                entry['status'] = status
+                if status == 'done' and os.path.exists(job['output_path']):
+                    entry['output_size'] = os.path.getsize(job['output_path'])
+            entry['updated_at'] = time.time()
+            self.save()
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'jobs': self.entries}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+def share_threads(editor_options, workers):
+    # x264 and the ffmpeg decoder default to one thread per core; with several videos rendering
+    # at once each worker gets its share, instead of every worker sizing for the whole machine
+    options = dict(editor_options or {})
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    for key in ('encoder_threads', 'decoder_threads'):
+        if not options.get(key):
+            options[key] = threads
+    return options
+
+class BatchScheduler:
+    def __init__(self, workers=None, title_concurrency=4, manifest=None, metrics_sinks=()):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.title_concurrency = title_concurrency
+        self.manifest = manifest
+        self.metrics_sinks = metrics_sinks
+        self.status = {}
+        self.progress = {}
+
+    def run(self, jobs, stop_event, status_callback=None, progress_callback=None, event_callback=None):
+        self.status = {i: 'pending' for i in range(len(jobs))}
+        self.progress = {i: 0.0 for i in range(len(jobs))}
+        if not jobs:
+            return self.status
+
+        jobs = list(jobs)
+        pending = list(range(len(jobs)))
+        if self.manifest:
+            pending = []
+            for index, job in enumerate(jobs):
+                jobs[index], up_to_date = self.manifest.prepare(job)
+                if not up_to_date:
+                    pending.append(index)
+
+        def handle(event):
+            kind, index = event[0], event[1]
+            if kind == 'status':
+                self.status[index] = event[2]
+                if event[2] in ('done', 'failed', 'cancelled', 'skipped'):
+                    self.progress[index] = 100.0
+                if self.manifest and event[2] in ('done', 'failed', 'cancelled'):
+                    self.manifest.record(jobs[index], status=event[2])
+                if event[3] and status_callback:
+                    status_callback(event[3])
+            elif kind == 'message':
+                if status_callback:
+                    status_callback(event[2])
+            elif kind == 'progress':
+                self.progress[index] = event[2]
+            elif kind == 'title':
+                if self.manifest:
+                    self.manifest.record(jobs[index], title=event[2])
+            elif kind == 'metrics':
+                for sink in self.metrics_sinks:
+                    try:
+                        sink.export(event[2])
+                    except OSError as e:
+                        if status_callback:
+                            status_callback(f"Failed to export metrics: {e}")
+            if event_callback:
+                payload = {'event': kind, 'video': jobs[index]['input_path']}
+                if kind == 'status':
+                    payload.update(status=event[2], message=event[3])
+                elif kind == 'message':
+                    payload['message'] = event[2]
+                elif kind == 'title':
+                    payload['title'] = event[2]
+                elif kind == 'preview':
+                    payload['image'] = event[2]
+                elif kind == 'metrics':
+                    payload['metrics'] = event[2]
+                else:
+                    payload['percent'] = round(event[2], 1)
+                    if len(event) > 3 and event[3] is not None:
+                        payload.update(frame=event[3], total=event[4])
+                event_callback(payload)
+            if progress_callback and kind in ('status', 'progress'):
+                progress_callback(sum(self.progress.values()) / len(jobs))
+
+        for index in sorted(set(range(len(jobs))) - set(pending)):
+            handle(('status', index, 'skipped',
+                    f"⏭️ {os.path.basename(jobs[index]['input_path'])} is up to date, skipping."))
+        if not pending:
+            return self.status
+
+        workers = min(self.workers, len(pending))
+        if workers > 1:
+            for index in pending:
+                jobs[index] = dict(jobs[index], editor_options=share_threads(jobs[index].get('editor_options'),
+                                                                             workers))
+
+        prefetcher = None
+        if self.title_concurrency and self.title_concurrency > 0:
+            prefetcher = TitlePrefetcher(self.title_concurrency)
+            prefetcher.prefetch(jobs, pending)
+
+        def resolve(index, job):
+            return prefetcher.resolve(index, job, stop_event) if prefetcher else job
+
+        try:
+            if self.workers == 1 or len(pending) == 1:
+                for index in pending:
+                    if stop_event.is_set():
+                        break
+                    _run_batch_job(index, resolve(index, jobs[index]), handle, stop_event)
+            else:
+                self._run_pool(jobs, pending, stop_event, handle, resolve)
+        finally:
+            if prefetcher:
+                prefetcher.shutdown()
+        return self.status
+
+    def _run_pool(self, jobs, pending, stop_event, handle, resolve):
+        # Spawned workers do not inherit the Tk thread state of the parent process
+        ctx = multiprocessing.get_context('spawn')
+        progress_queue = ctx.Queue()
+        worker_stop = ctx.Event()
+        pool = ctx.Pool(processes=min(self.workers, len(pending)),
+                        initializer=_batch_worker_init,
+                        initargs=(progress_queue, worker_stop))
+        results = []
+
+        def submit_jobs():
+            # Each job is queued as soon as its title is ready, so workers never wait on the network
+            for index in pending:
+                if stop_event.is_set():
+                    break
+                results.append(pool.apply_async(_batch_worker_run, (index, resolve(index, jobs[index]))))
+
+        submitter = threading.Thread(target=submit_jobs, daemon=True)
+        try:
+            submitter.start()
+            while True:
+                if stop_event.is_set() and not worker_stop.is_set():
+                    worker_stop.set()
+                try:
+                    handle(progress_queue.get(timeout=0.1))
+                    continue
+                except queue.Empty:
+                    pass
+                if not submitter.is_alive() and all(result.ready() for result in list(results)):
+                    break
+            while True:
+                try:
+                    handle(progress_queue.get_nowait())
+                except queue.Empty:
+                    break
+            pool.close()
+        finally:
+            submitter.join()
+            pool.terminate()
+            pool.join()
+
+def load_config_file(path=CONFIG_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def find_video_files(input_dir):
+    return sorted(f for f in Path(input_dir).glob('*') if f.suffix.lower() in VIDEO_EXTENSIONS)
+
+def find_background_files(background_dir):
+    if not background_dir or not os.path.exists(background_dir):
+        return []
+    return [os.path.join(background_dir, f)
+            for f in os.listdir(background_dir)
+            if f.lower().endswith(BACKGROUND_EXTENSIONS)]
+
+def editor_options_from_config(config):
+    return {key: config[key] for key in EDITOR_OPTION_KEYS if key in config}
+
+def build_batch_jobs(video_files, output_dir, background_files, custom_title=None,
+                     title_position='top', anti_plagiarism=True, api_key=None,
+                     editor_options=None):
+    jobs = []
+    for video_file in video_files:
+        video_file = Path(video_file)
+        output_name = f"{video_file.stem}_editado.mp4"
+        jobs.append({
+            'input_path': str(video_file),
+            'output_path': os.path.join(output_dir, output_name),
+            'background_image': random.choice(background_files) if background_files else None,
+            'custom_title': custom_title or None,
+            'title_position': title_position,
+            'anti_plagiarism': anti_plagiarism,
+            'api_key': api_key,
+            'editor_options': dict(editor_options or {})
+        })
+    return jobs
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
 class VideoEditorGUI:
     def __init__(self, root):
         self.root = root
@@ -491,16 +2712,26 @@ class VideoEditorGUI:
         self.title_position = tk.StringVar(value="top")
         self.anti_plagiarism = tk.BooleanVar(value=True)
         self.shutdown_after = tk.BooleanVar(value=False)
+        self.workers = tk.IntVar(value=os.cpu_count() or 1)
+        self.loaded_config = {}
         self.stop_event = threading.Event()
         self.processing_thread = None
-        
-        self.editor = SimpleVideoEditor()
+        # Worker threads never touch Tk: they queue events that the UI thread drains
+        self.ui_queue = queue.Queue()
+        self.batch_started = None
+        self.video_stats = {}
+        self.last_video = None
+        # Single-slot preview buffer: a newer thumbnail replaces one the UI has not shown yet
+        self.latest_preview = None
+        self.preview_lock = threading.Lock()
+        self.preview_image = None
         
         self.load_config()
         
         self.create_widgets()
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(UI_REFRESH_MS, self.drain_ui_queue)
     
     def setup_styles(self):
         style = ttk.Style()
@@ -655,6 +2886,12 @@ class VideoEditorGUI:
         ttk.Checkbutton(options_frame, text="Shutdown After Processing", 
                        variable=self.shutdown_after).grid(row=4, column=0, sticky="w", pady=(0, 5))
         
+        workers_frame = ttk.Frame(options_frame)
+        workers_frame.grid(row=5, column=0, sticky="ew", pady=(0, 5))
+        ttk.Label(workers_frame, text="Parallel Workers:", style='Normal.TLabel').pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, from_=1, to=max(64, os.cpu_count() or 1), width=5,
+                    textvariable=self.workers).pack(side=tk.LEFT, padx=(10, 0))
+        
         ttk.Button(parent, text="Save Configuration", 
                   command=self.save_config, style='Custom.TButton').grid(row=3, column=0, pady=10, sticky="e")
     
@@ -673,6 +2910,9 @@ class VideoEditorGUI:
         self.progress_bar = ttk.Progressbar(status_frame, variable=self.progress_var, maximum=100, style='TProgressbar')
         self.progress_bar.grid(row=1, column=0, sticky="ew", pady=(5, 0))
         
+        self.stats_label = ttk.Label(status_frame, text="", style='Normal.TLabel')
+        self.stats_label.grid(row=2, column=0, sticky="w", pady=(5, 0))
+        
         buttons_frame = ttk.Frame(parent)
         buttons_frame.grid(row=1, column=0, sticky="ew", pady=(0, 10))
         buttons_frame.columnconfigure(0, weight=1)
@@ -696,7 +2936,8 @@ class VideoEditorGUI:
         preview_frame.columnconfigure(0, weight=1)
         preview_frame.rowconfigure(0, weight=1)
         
-        self.preview_label = ttk.Label(preview_frame, text="No preview available", style='Normal.TLabel')
+        self.preview_label = ttk.Label(preview_frame, text="No preview available", style='Normal.TLabel',
+                                       anchor=tk.CENTER)
         self.preview_label.pack(expand=True, fill=tk.BOTH)
     
     def create_log_tab(self, parent):
@@ -734,23 +2975,97 @@ class VideoEditorGUI:
             self.background_dir.set(directory)
     
     def log_message(self, message):
-        self.log_text.insert(tk.END, f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.ui_queue.put(('log', f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}"))
     
     def clear_log(self):
         self.log_text.delete(1.0, tk.END)
     
     def update_status(self, message):
-        self.status_label.config(text=message)
+        self.ui_queue.put(('status', message))
         self.log_message(message)
     
     def update_progress(self, value):
-        self.progress_var.set(value)
-        self.root.update_idletasks()
+        self.ui_queue.put(('progress', value))
+
+    def post_event(self, event):
+        if event.get('event') == 'preview':
+            with self.preview_lock:
+                self.latest_preview = event['image']
+            return
+        self.ui_queue.put(('event', {**event, 'time': time.monotonic()}))
+
+    def show_preview(self):
+        with self.preview_lock:
+            data, self.latest_preview = self.latest_preview, None
+        if data is None:
+            return
+        try:
+            self.preview_image = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+        except Exception:
+            return
+        self.preview_label.config(image=self.preview_image, text="")
+
+    def drain_ui_queue(self):
+        lines, status, progress, finished = [], None, None, False
+        try:
+            while True:
+                kind, value = self.ui_queue.get_nowait()
+                if kind == 'log':
+                    lines.append(value)
+                elif kind == 'status':
+                    status = value
+                elif kind == 'progress':
+                    progress = value
+                elif kind == 'event':
+                    self.track_event(value)
+                elif kind == 'finished':
+                    finished = True
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines[-LOG_MAX_LINES:]) + "\n")
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES}.0")
+            self.log_text.see(tk.END)
+        if status is not None:
+            self.status_label.config(text=status)
+        if progress is not None:
+            self.progress_var.set(progress)
+            self.stats_label.config(text=self.stats_text(progress))
+        self.show_preview()
+        if finished:
+            self.on_processing_finished()
+        self.root.after(UI_REFRESH_MS, self.drain_ui_queue)
+
+    def track_event(self, event):
+        if event.get('event') != 'progress' or event.get('frame') is None:
+            return
+        stats = self.video_stats.get(event['video'])
+        if stats is None or event['frame'] < stats['frame']:
+            stats = self.video_stats[event['video']] = {'started': event['time'], 'first_frame': event['frame']}
+        stats.update(frame=event['frame'], total=event['total'], time=event['time'])
+        self.last_video = event['video']
+
+    def stats_text(self, progress):
+        parts = []
+        stats = self.video_stats.get(self.last_video)
+        if stats:
+            elapsed = stats['time'] - stats['started']
+            fps = (stats['frame'] - stats['first_frame']) / elapsed if elapsed > 0 else 0.0
+            parts.append(f"{os.path.basename(self.last_video)}: frame {stats['frame']}/{stats['total']}")
+            if fps:
+                parts.append(f"{fps:.1f} fps")
+                parts.append(f"ETA {format_duration(max(0, stats['total'] - stats['frame']) / fps)}")
+        if self.batch_started and 0 < progress < 100:
+            elapsed = time.monotonic() - self.batch_started
+            parts.append(f"batch ETA {format_duration(elapsed * (100 - progress) / progress)}")
+        return " · ".join(parts)
     
     def save_config(self):
-        config = {
+        config = dict(self.loaded_config)
+        config.update({
             'api_key': self.api_key.get(),
             'input_dir': self.input_dir.get(),
             'output_dir': self.output_dir.get(),
@@ -758,11 +3073,12 @@ class VideoEditorGUI:
             'custom_title': self.custom_title.get(),
             'title_position': self.title_position.get(),
             'anti_plagiarism': self.anti_plagiarism.get(),
-            'shutdown_after': self.shutdown_after.get()
-        }
+            'shutdown_after': self.shutdown_after.get(),
+            'workers': self.workers.get()
+        })
         
         try:
-            with open('video_editor_config.json', 'w', encoding='utf-8') as f:
+            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
             messagebox.showinfo("Success", "Configuration saved successfully!")
         except Exception as e:
@@ -770,9 +3086,9 @@ class VideoEditorGUI:
     
     def load_config(self):
         try:
-            if os.path.exists('video_editor_config.json'):
-                with open('video_editor_config.json', 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+            if os.path.exists(CONFIG_FILE):
+                config = load_config_file()
+                self.loaded_config = config
                 
                 self.api_key.set(config.get('api_key', ''))
                 self.input_dir.set(config.get('input_dir', 'videos_originais'))
@@ -782,6 +3098,7 @@ class VideoEditorGUI:
                 self.title_position.set(config.get('title_position', 'top'))
                 self.anti_plagiarism.set(config.get('anti_plagiarism', True))
                 self.shutdown_after.set(config.get('shutdown_after', False))
+                self.workers.set(config.get('workers', os.cpu_count() or 1))
         except Exception as e:
             self.log_message(f"Failed to load configuration: {e}")
     
@@ -794,7 +3111,7 @@ class VideoEditorGUI:
             messagebox.showerror("Error", f"Input folder does not exist: {self.input_dir.get()}")
             return
         
-        if not self.api_key.get() and GEMINI_AVAILABLE:
+        if not self.api_key.get() and gemini_available():
             if not messagebox.askyesno("Warning", 
                                      "API Key not configured. Continue with random titles?"):
                 return
@@ -804,8 +3121,26 @@ class VideoEditorGUI:
         self.process_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.stop_event.clear()
+        self.batch_started = time.monotonic()
+        self.video_stats = {}
         
-        self.processing_thread = threading.Thread(target=self.process_videos)
+        try:
+            workers = int(self.workers.get())
+        except (tk.TclError, ValueError):
+            workers = 1
+        # Tk variables are read here, on the UI thread, and handed to the worker thread
+        settings = {
+            'input_dir': self.input_dir.get(),
+            'output_dir': self.output_dir.get(),
+            'background_dir': self.background_dir.get(),
+            'custom_title': self.custom_title.get(),
+            'title_position': self.title_position.get(),
+            'anti_plagiarism': self.anti_plagiarism.get(),
+            'api_key': self.api_key.get(),
+            'shutdown_after': self.shutdown_after.get(),
+            'workers': workers
+        }
+        self.processing_thread = threading.Thread(target=self.process_videos, args=(settings,))
         self.processing_thread.daemon = True
         self.processing_thread.start()
     
@@ -825,11 +3160,9 @@ class VideoEditorGUI:
             self.update_progress(0)
             self.processing_thread = None
     
-    def process_videos(self):
+    def process_videos(self, settings):
         try:
-            input_path = Path(self.input_dir.get())
-            video_extensions = ('.mp4', '.avi', '.mkv', '.webm', '.mov')
-            video_files = [f for f in input_path.glob('*') if f.suffix.lower() in video_extensions]
+            video_files = find_video_files(settings['input_dir'])
             
             if not video_files:
                 self.update_status("No videos found in input folder.")
@@ -837,63 +3170,41 @@ class VideoEditorGUI:
             
             self.update_status(f"Found {len(video_files)} videos to process.")
             
-            background_files = []
-            if os.path.exists(self.background_dir.get()):
-                background_files = [os.path.join(self.background_dir.get(), f) 
-                                  for f in os.listdir(self.background_dir.get())
-                                  if f.lower().endswith(('.png', '.jpeg', '.jpg'))]
+            background_files = find_background_files(settings['background_dir'])
             
             if not background_files:
                 self.update_status("No backgrounds found. Using default.")
             
-            for i, video_file in enumerate(video_files):
-                if self.stop_event.is_set():
-                    self.update_status("Processing stopped by user.")
-                    break
-                
-                self.update_status(f"Processing {video_file.name}...")
-                
-                output_name = f"{video_file.stem}_editado.mp4"
-                output_path = os.path.join(self.output_dir.get(), output_name)
-                
-                background_path = random.choice(background_files) if background_files else None
-                
-                def progress_callback(message):
-                    if not self.stop_event.is_set():
-                        self.update_status(message)
-                
-                try:
-                    success = self.editor.process_video_with_opencv(
-                        input_path=str(video_file),
-                        output_path=output_path,
-                        background_image=background_path,
-                        custom_title=self.custom_title.get() if self.custom_title.get() else None,
-                        title_position=self.title_position.get(),
-                        anti_plagiarism=self.anti_plagiarism.get(),
-                        api_key=self.api_key.get(),
-                        progress_callback=progress_callback,
-                        stop_event=self.stop_event
-                    )
-                    
-                    if self.stop_event.is_set():
-                        self.update_status(f"Processing of {video_file.name} interrupted.")
-                        break
-                        
-                    if success:
-                        self.update_status(f"✅ {video_file.name} processed successfully!")
-                    else:
-                        self.update_status(f"❌ Error processing {video_file.name}")
-                        
-                except Exception as e:
-                    self.update_status(f"❌ Error processing {video_file.name}: {e}")
-                
-                progress = ((i + 1) / len(video_files)) * 100
-                self.update_progress(progress)
+            jobs = build_batch_jobs(
+                video_files,
+                settings['output_dir'],
+                background_files,
+                custom_title=settings['custom_title'],
+                title_position=settings['title_position'],
+                anti_plagiarism=settings['anti_plagiarism'],
+                api_key=settings['api_key'],
+                editor_options={'preview_fps': 2, **editor_options_from_config(self.loaded_config)}
+            )
+            
+            scheduler = BatchScheduler(settings['workers'], self.loaded_config.get('title_concurrency', 4),
+                                       JobManifest(os.path.join(settings['output_dir'], MANIFEST_FILE)),
+                                       create_metrics_sinks(self.loaded_config.get('metrics')))
+            self.update_status(f"Using {min(scheduler.workers, len(jobs))} parallel worker(s).")
+            scheduler.run(jobs, self.stop_event,
+                          status_callback=self.update_status,
+                          progress_callback=self.update_progress,
+                          event_callback=self.post_event)
+            
+            if self.stop_event.is_set():
+                self.update_status("Processing stopped by user.")
             
             if not self.stop_event.is_set():
-                self.update_status(f"🎉 Processing complete! {len(video_files)} videos processed.")
+                done = sum(1 for status in scheduler.status.values() if status == 'done')
+                skipped = sum(1 for status in scheduler.status.values() if status == 'skipped')
+                self.update_status(f"🎉 Processing complete! {done}/{len(video_files)} videos processed"
+                                   f"{f', {skipped} already up to date' if skipped else ''}.")
             
-            if self.shutdown_after.get() and not self.stop_event.is_set():
+            if settings['shutdown_after'] and not self.stop_event.is_set():
                 self.update_status("Shutting down in 30 seconds...")
                 if os.name == 'nt':
                     os.system("shutdown /s /t 30")
@@ -904,11 +3215,16 @@ class VideoEditorGUI:
             self.update_status(f"❌ General processing error: {e}")
         
         finally:
-            self.process_button.config(state=tk.NORMAL)
-            self.stop_button.config(state=tk.DISABLED)
-            self.update_progress(0)
             self.stop_event.clear()
-            self.processing_thread = None
+            self.ui_queue.put(('finished', None))
+
+    def on_processing_finished(self):
+        self.process_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        self.progress_var.set(0)
+        self.stats_label.config(text="")
+        self.batch_started = None
+        self.processing_thread = None
     
     def on_closing(self):
         self.stop_event.set()
@@ -917,25 +3233,16 @@ class VideoEditorGUI:
         self.save_config()
         self.root.destroy()
 
-def main():
+def run_gui():
+    _load_tk()
     missing_deps = []
     
-    if not GEMINI_AVAILABLE:
+    if not gemini_available():
         missing_deps.append("google-generativeai")
     
-    if not SPEECH_AVAILABLE:
+    if not speech_available():
         missing_deps.append("speech_recognition e/ou pydub")
     
-    try:
-        import cv2
-    except ImportError:
-        missing_deps.append("opencv-python")
-    
-    try:
-        from PIL import Image
-    except ImportError:
-        missing_deps.append("Pillow")
-    
     if missing_deps:
         print("⚠️  Missing dependencies:")
         for dep in missing_deps:
@@ -944,6 +3251,10 @@ def main():
         input("Press Enter to continue anyway...")
     
     root = tk.Tk()
+    if not gemini_available():
+        messagebox.showwarning("Aviso", "google-generativeai não instalado. Função de IA desabilitada.")
+    if not speech_available():
+        messagebox.showwarning("Aviso", "speech_recognition ou pydub não instalados. Transcrição desabilitada.")
     app = VideoEditorGUI(root)
     
     root.update_idletasks()
@@ -953,5 +3264,140 @@ def main():
     
     root.mainloop()
 
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="make.py",
+        description="Kwai Video Editor. Without arguments the graphical interface is opened; "
+                    "with --headless or input paths the batch runs without Tk and prints JSON lines."
+    )
+    parser.add_argument('inputs', nargs='*', help="Video files or folders (default: input_dir from the config)")
+    parser.add_argument('--headless', action='store_true', help="Run without the graphical interface")
+    parser.add_argument('--config', default=CONFIG_FILE, help="Configuration file with default options")
+    parser.add_argument('--output-dir', help="Output folder")
+    parser.add_argument('--background-dir', help="Backgrounds folder")
+    parser.add_argument('--title', help="Custom title (AI title when omitted)")
+    parser.add_argument('--title-position', choices=('top', 'bottom'))
+    parser.add_argument('--anti-plagiarism', dest='anti_plagiarism', action='store_true', default=None)
+    parser.add_argument('--no-anti-plagiarism', dest='anti_plagiarism', action='store_false')
+    parser.add_argument('--api-key', help="Google Gemini API key")
+    parser.add_argument('--workers', type=int, help="Number of parallel worker processes")
+    parser.add_argument('--title-concurrency', type=int,
+                        help="AI titles generated ahead of rendering in parallel, 0 = generate inside each job")
+    parser.add_argument('--preset', dest='encoder_preset', help="x264 preset (default: veryfast)")
+    parser.add_argument('--crf', dest='encoder_crf', type=int, help="x264 CRF quality (default: 23)")
+    parser.add_argument('--encoder-threads', dest='encoder_threads', type=int,
+                        help="ffmpeg encoder threads, 0 = automatic")
+    parser.add_argument('--decoder', dest='decode_backend', choices=('auto', 'ffmpeg', 'opencv'),
+                        help="Decode backend (default: ffmpeg when available)")
+    parser.add_argument('--decoder-threads', dest='decoder_threads', type=int,
+                        help="ffmpeg decoder threads, 0 = automatic")
+    parser.add_argument('--force-regenerate-titles', dest='force_regenerate_titles',
+                        action='store_true', default=None,
+                        help="Ignore cached AI titles and generate new ones")
+    parser.add_argument('--transcription-engine', dest='transcription_engine', choices=TRANSCRIPTION_ENGINES,
+                        help="Speech-to-text engine used for AI titles (default: google)")
+    parser.add_argument('--vosk-model', dest='vosk_model_path',
+                        help="Folder of the offline Vosk model used by --transcription-engine vosk")
+    parser.add_argument('--segment-workers', dest='segment_workers', type=int,
+                        help="Processes that render parts of one long video in parallel (default: 1)")
+    parser.add_argument('--batch-frames', dest='batch_frames', type=int,
+                        help="Frames decoded, composited and encoded together as one block (default: 1)")
+    parser.add_argument('--render-mode', dest='render_mode', choices=RENDER_MODES,
+                        help="auto: videos without anti-plagiarism effects are rendered by one ffmpeg "
+                             "filtergraph; frames: always composite frame by frame (default: auto)")
+    parser.add_argument('--metrics',
+                        help="Per-video metrics: comma-separated log, jsonl:<file>, prometheus:<port>")
+    parser.add_argument('--force', action='store_true',
+                        help=f"Render every video again, even those recorded as done in {MANIFEST_FILE}")
+    parser.add_argument('--effects', dest='anti_plagiarism_effects',
+                        help="Comma-separated anti-plagiarism perturbations the video seed may pick from "
+                             f"({', '.join(ANTI_PLAGIARISM_EFFECTS)}; default: {','.join(DEFAULT_EFFECTS)})")
+    return parser
+
+def emit_json(event):
+    print(json.dumps(event, ensure_ascii=False), flush=True)
+
+def run_cli(args):
+    config = {}
+    if os.path.exists(args.config):
+        try:
+            config = load_config_file(args.config)
+        except Exception as e:
+            emit_json({'event': 'error', 'message': f"Failed to load configuration: {e}"})
+            return 2
+
+    def option(value, key, default):
+        return value if value is not None else config.get(key, default)
+
+    inputs = args.inputs or [option(None, 'input_dir', 'videos_originais')]
+    video_files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            video_files.extend(find_video_files(item))
+        elif os.path.isfile(item):
+            video_files.append(Path(item))
+        else:
+            emit_json({'event': 'error', 'message': f"Input not found: {item}"})
+            return 2
+    if not video_files:
+        emit_json({'event': 'error', 'message': "No videos found."})
+        return 2
+
+    editor_options = editor_options_from_config(
+        {**config, **{key: value for key, value in vars(args).items()
+                      if key in EDITOR_OPTION_KEYS and value is not None}})
+    config_dir = os.path.dirname(os.path.abspath(args.config))
+    editor_options.setdefault('title_cache', os.path.join(config_dir, TITLE_CACHE_FILE))
+    editor_options.setdefault('background_cache_dir', os.path.join(config_dir, BACKGROUND_CACHE_DIR))
+
+    output_dir = option(args.output_dir, 'output_dir', 'videos_editados')
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = build_batch_jobs(
+        video_files,
+        output_dir,
+        find_background_files(option(args.background_dir, 'background_dir', 'backgrounds')),
+        custom_title=option(args.title, 'custom_title', ''),
+        title_position=option(args.title_position, 'title_position', 'top'),
+        anti_plagiarism=option(args.anti_plagiarism, 'anti_plagiarism', True),
+        api_key=option(args.api_key, 'api_key', ''),
+        editor_options=editor_options
+    )
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+
+    manifest = JobManifest(os.path.join(output_dir, MANIFEST_FILE))
+    if args.force:
+        manifest.entries = {}
+    try:
+        metrics_sinks = create_metrics_sinks(editor_options.get('metrics'))
+    except (OSError, ValueError) as e:
+        emit_json({'event': 'error', 'message': f"Invalid metrics sink: {e}"})
+        return 2
+    scheduler = BatchScheduler(option(args.workers, 'workers', os.cpu_count() or 1),
+                               option(args.title_concurrency, 'title_concurrency', 4),
+                               manifest, metrics_sinks)
+    emit_json({'event': 'start', 'videos': len(jobs), 'workers': min(scheduler.workers, len(jobs))})
+    def emit_event(event):
+        # Thumbnails are only useful to the GUI
+        if event['event'] != 'preview':
+            emit_json(event)
+
+    scheduler.run(jobs, stop_event, event_callback=emit_event)
+
+    statuses = list(scheduler.status.values())
+    summary = {status: statuses.count(status) for status in ('done', 'skipped', 'failed', 'cancelled')}
+    emit_json({'event': 'finished', **summary})
+    if stop_event.is_set():
+        return 130
+    return 0 if summary['done'] + summary['skipped'] == len(jobs) else 1
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.headless or args.inputs:
+        return run_cli(args)
+    run_gui()
+    return 0
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())